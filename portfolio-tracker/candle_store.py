@@ -0,0 +1,385 @@
+"""
+Local OHLCV candle store (Binance, Bybit, Yahoo Finance)
+"""
+import json
+import os
+import re
+import shutil
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import requests
+
+# Interval name -> length in seconds
+INTERVALS = {
+    '1m': 60,
+    '5m': 5 * 60,
+    '15m': 15 * 60,
+    '1h': 60 * 60,
+    '4h': 4 * 60 * 60,
+    '1d': 24 * 60 * 60,
+    '1w': 7 * 24 * 60 * 60,
+}
+
+COLUMNS = {
+    'timestamp': np.int64,   # candle open time, epoch seconds
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'volume': np.float64,
+}
+
+BYBIT_INTERVALS = {'1m': '1', '5m': '5', '15m': '15', '1h': '60', '4h': '240', '1d': 'D', '1w': 'W'}
+YAHOO_INTERVALS = {'1m': '1m', '5m': '5m', '15m': '15m', '1h': '1h', '1d': '1d', '1w': '1wk'}
+
+YAHOO_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+
+def _empty():
+    return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+
+
+def _from_rows(rows):
+    """[(timestamp, open, high, low, close, volume), ...] -> sorted, de-duplicated columns"""
+    if not rows:
+        return _empty()
+    data = np.array(rows, dtype=np.float64)
+    timestamps = data[:, 0].astype(np.int64)
+    timestamps, first = np.unique(timestamps, return_index=True)
+    columns = {'timestamp': timestamps}
+    for i, name in enumerate(list(COLUMNS)[1:], start=1):
+        columns[name] = data[first, i]
+    return columns
+
+
+def fetch_binance(symbol: str, interval: str, start: int, end: int):
+    """Klines from the public Binance REST endpoint (same data as Client.get_klines)"""
+    rows = []
+    cursor = start * 1000
+    while cursor <= end * 1000:
+        response = requests.get('https://api.binance.com/api/v3/klines', params={
+            'symbol': symbol,
+            'interval': interval,
+            'startTime': cursor,
+            'endTime': end * 1000,
+            'limit': 1000
+        }, timeout=10)
+        if response.status_code != 200:
+            print(f"Binance klines error for {symbol}: HTTP {response.status_code}")
+            break
+        klines = response.json()
+        if not klines:
+            break
+        rows.extend((k[0] // 1000, k[1], k[2], k[3], k[4], k[5]) for k in klines)
+        cursor = klines[-1][0] + INTERVALS[interval] * 1000
+        if len(klines) < 1000:
+            break
+    return _from_rows(rows)
+
+
+def fetch_bybit(symbol: str, interval: str, start: int, end: int):
+    """Spot klines from the Bybit v5 market endpoint (returned newest first)"""
+    rows = []
+    cursor = end * 1000
+    while cursor >= start * 1000:
+        response = requests.get('https://api.bybit.com/v5/market/kline', params={
+            'category': 'spot',
+            'symbol': symbol,
+            'interval': BYBIT_INTERVALS[interval],
+            'start': start * 1000,
+            'end': cursor,
+            'limit': 1000
+        }, timeout=10)
+        if response.status_code != 200:
+            print(f"Bybit kline error for {symbol}: HTTP {response.status_code}")
+            break
+        klines = response.json().get('result', {}).get('list', [])
+        if not klines:
+            break
+        rows.extend((int(k[0]) // 1000, k[1], k[2], k[3], k[4], k[5]) for k in klines)
+        cursor = int(klines[-1][0]) - 1
+        if len(klines) < 1000:
+            break
+    return _from_rows(rows)
+
+
+def fetch_yahoo(symbol: str, interval: str, start: int, end: int):
+    """Candles from the Yahoo v8 chart endpoint (same one stock_prices.py uses)"""
+    response = requests.get(
+        f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}",
+        params={'period1': start, 'period2': end, 'interval': YAHOO_INTERVALS[interval]},
+        headers=YAHOO_HEADERS, timeout=10
+    )
+    if response.status_code != 200:
+        print(f"Yahoo chart error for {symbol}: HTTP {response.status_code}")
+        return _empty()
+    result = (response.json().get('chart', {}).get('result') or [None])[0]
+    if not result or not result.get('timestamp'):
+        return _empty()
+    quote = result['indicators']['quote'][0]
+    columns = {'timestamp': np.array(result['timestamp'], dtype=np.int64)}
+    for name in list(COLUMNS)[1:]:
+        columns[name] = np.array(quote.get(name) or [], dtype=np.float64)
+    # Yahoo returns null rows for halted sessions
+    keep = ~np.isnan(columns['close'])
+    return {name: column[keep] for name, column in columns.items()}
+
+
+FETCHERS = {
+    'binance': fetch_binance,
+    'bybit': fetch_bybit,
+    'yahoo': fetch_yahoo,
+}
+
+
+class CandleStore:
+    """On-disk candles keyed by (source, symbol, interval).
+
+    Each series is a directory of append-only segments; a segment is one
+    .npy file per column and is never rewritten, only merged on compaction.
+    segments.json lists the segments with their first/last open time, so
+    an update only fetches the ranges before the first and after the last
+    stored candle, plus interior gaps. series.json remembers the earliest
+    candle the source has and the gaps already asked for, so neither is
+    requested again. Reads memory-map the segments and return zero-copy
+    slices when the range falls in a single segment.
+    """
+
+    MAX_SEGMENTS = 16
+    # How far back a series starts when nothing is stored and no start is given
+    DEFAULT_CANDLES = 1000
+    # Sources trading around the clock; elsewhere nights, weekends and
+    # holidays leave regular holes in the series
+    CONTINUOUS_SOURCES = ('binance', 'bybit')
+    MARKET_CLOSED = 4 * 24 * 60 * 60
+
+    def __init__(self, root: str = 'candles', fetchers: Optional[Dict[str, Callable]] = None):
+        self.root = root
+        self.fetchers = fetchers or FETCHERS
+        self._mmaps = {}
+
+    def _series_dir(self, source, symbol, interval):
+        safe_symbol = re.sub(r'[^A-Za-z0-9._=^-]', '_', symbol)
+        return os.path.join(self.root, source, safe_symbol, interval)
+
+    def _manifest_file(self, series_dir):
+        return os.path.join(series_dir, 'segments.json')
+
+    def _load_manifest(self, series_dir):
+        """List of {'name', 'start', 'end', 'rows'} sorted by start"""
+        if os.path.exists(self._manifest_file(series_dir)):
+            try:
+                with open(self._manifest_file(series_dir), 'r') as f:
+                    return json.load(f)
+            except:
+                print(f"Error loading {self._manifest_file(series_dir)}, series will be refetched")
+        return []
+
+    def _save_manifest(self, series_dir, manifest):
+        """Save the segment list atomically"""
+        manifest.sort(key=lambda segment: segment['start'])
+        tmp_file = self._manifest_file(series_dir) + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_file, self._manifest_file(series_dir))
+
+    def _meta_file(self, series_dir):
+        return os.path.join(series_dir, 'series.json')
+
+    def _load_meta(self, series_dir):
+        """{'first_available': open time or None, 'checked_gaps': [[start, end], ...]}"""
+        meta = {'first_available': None, 'checked_gaps': []}
+        if os.path.exists(self._meta_file(series_dir)):
+            try:
+                with open(self._meta_file(series_dir), 'r') as f:
+                    meta.update(json.load(f))
+            except:
+                print(f"Error loading {self._meta_file(series_dir)}, gaps will be rechecked")
+        return meta
+
+    def _save_meta(self, series_dir, meta):
+        """Save the series metadata atomically"""
+        tmp_file = self._meta_file(series_dir) + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_file, self._meta_file(series_dir))
+
+    def _gap_tolerance(self, source, step):
+        """Largest distance between open times that is not a missing candle"""
+        return step if source in self.CONTINUOUS_SOURCES else max(step, self.MARKET_CLOSED)
+
+    def _gaps(self, series_dir, manifest, tolerance, start, end, checked):
+        """Holes between stored candles in [start, end] not asked for yet.
+
+        Each gap includes the stored candles around it, so a working source
+        never answers with nothing.
+        """
+        timestamps = self._read(series_dir, manifest, start, end)['timestamp']
+        holes = np.flatnonzero(np.diff(timestamps) > tolerance)
+        gaps = [(int(timestamps[i]), int(timestamps[i + 1])) for i in holes]
+        checked = {tuple(gap) for gap in checked}
+        return [gap for gap in gaps if gap not in checked]
+
+    @staticmethod
+    def _next_name(manifest):
+        return f"{max([int(segment['name']) for segment in manifest] or [0]) + 1:06d}"
+
+    def _write_segment(self, series_dir, manifest, columns, name=None):
+        """Write columns as a new segment and register it in `manifest`"""
+        name = name or self._next_name(manifest)
+        path = os.path.join(series_dir, name)
+        os.makedirs(path, exist_ok=True)
+        for column, dtype in COLUMNS.items():
+            np.save(os.path.join(path, f"{column}.npy"), np.asarray(columns[column], dtype=dtype))
+        timestamps = columns['timestamp']
+        manifest.append({
+            'name': name,
+            'start': int(timestamps[0]),
+            'end': int(timestamps[-1]),
+            'rows': int(len(timestamps))
+        })
+
+    def _segment(self, series_dir, name):
+        """Memory-mapped columns of one segment (cached, segments are immutable)"""
+        path = os.path.join(series_dir, name)
+        if path not in self._mmaps:
+            self._mmaps[path] = {
+                column: np.load(os.path.join(path, f"{column}.npy"), mmap_mode='r')
+                for column in COLUMNS
+            }
+        return self._mmaps[path]
+
+    def update(self, source: str, symbol: str, interval: str,
+               start: Optional[int] = None, end: Optional[int] = None) -> int:
+        """Fetch only the candles missing from [start, end]; returns rows added.
+
+        Only closed candles are stored, the one still forming is skipped
+        and picked up by the next update.
+        """
+        step = INTERVALS[interval]
+        tolerance = self._gap_tolerance(source, step)
+        now = int(datetime.now().timestamp())
+        end = min(now, end) if end is not None else now
+        series_dir = self._series_dir(source, symbol, interval)
+        manifest = self._load_manifest(series_dir)
+        meta = self._load_meta(series_dir)
+        meta_changed = False
+
+        # (start, end, kind): 'head' ranges also find where the listing begins.
+        # Head and gap ranges overlap a stored candle, so an empty answer is
+        # a failed request rather than a missing listing
+        if manifest:
+            first = min(segment['start'] for segment in manifest)
+            last = max(segment['end'] for segment in manifest)
+            ranges = [(last + step, end, 'tail')]
+            if start is not None and start < first and meta['first_available'] is None:
+                ranges.append((start, first, 'head'))
+            ranges.extend((gap_start, gap_end, 'gap') for gap_start, gap_end in
+                          self._gaps(series_dir, manifest, tolerance, start, end, meta['checked_gaps']))
+        else:
+            ranges = [(start if start is not None else end - step * self.DEFAULT_CANDLES, end, 'head')]
+
+        added = 0
+        for range_start, range_end, kind in ranges:
+            if range_start > range_end:
+                continue
+            try:
+                columns = self.fetchers[source](symbol, interval, range_start, range_end)
+            except Exception as e:
+                print(f"Error fetching {source} candles for {symbol} {interval}: {e}")
+                continue
+            timestamps = columns['timestamp']
+            keep = (timestamps >= range_start) & (timestamps <= range_end) & (timestamps + step <= now)
+            if manifest:
+                # Never store a candle twice
+                stored = self._read(series_dir, manifest, range_start, range_end)['timestamp']
+                keep &= ~np.isin(timestamps, stored)
+
+            if kind == 'gap' and len(timestamps):
+                meta['checked_gaps'].append([range_start, range_end])
+                meta_changed = True
+            elif kind == 'head' and len(timestamps):
+                # Nothing returned near the start: the source has no older candles
+                earliest = int(timestamps.min())
+                if earliest - range_start > tolerance:
+                    meta['first_available'] = earliest
+                    meta_changed = True
+
+            if not keep.any():
+                continue
+            os.makedirs(series_dir, exist_ok=True)
+            self._write_segment(series_dir, manifest, {name: column[keep] for name, column in columns.items()})
+            manifest.sort(key=lambda segment: segment['start'])
+            added += int(keep.sum())
+
+        if added:
+            if len(manifest) > self.MAX_SEGMENTS:
+                manifest = self._compact(series_dir, manifest)
+            self._save_manifest(series_dir, manifest)
+        if meta_changed:
+            os.makedirs(series_dir, exist_ok=True)
+            self._save_meta(series_dir, meta)
+        return added
+
+    def _compact(self, series_dir, manifest):
+        """Merge all segments of a series into one"""
+        merged = self._read(series_dir, manifest, None, None)
+        old = [segment['name'] for segment in manifest]
+        compacted = []
+        self._write_segment(series_dir, compacted, merged, name=self._next_name(manifest))
+        # The manifest switches over first, so a crash only leaves orphan directories
+        self._save_manifest(series_dir, compacted)
+        for name in old:
+            self._mmaps.pop(os.path.join(series_dir, name), None)
+            shutil.rmtree(os.path.join(series_dir, name), ignore_errors=True)
+        return compacted
+
+    def _read(self, series_dir, manifest, start, end):
+        parts = []
+        for segment in manifest:
+            if (start is not None and segment['end'] < start) or (end is not None and segment['start'] > end):
+                continue
+            columns = self._segment(series_dir, segment['name'])
+            timestamps = columns['timestamp']
+            lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+            hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side='right'))
+            if lo < hi:
+                parts.append({name: column[lo:hi] for name, column in columns.items()})
+        if not parts:
+            return _empty()
+        if len(parts) == 1:
+            return parts[0]
+        merged = {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+        # Gap fills overlap the time span of older segments
+        if np.any(np.diff(merged['timestamp']) < 0):
+            order = np.argsort(merged['timestamp'], kind='stable')
+            merged = {name: column[order] for name, column in merged.items()}
+        return merged
+
+    def get_range(self, source: str, symbol: str, interval: str, start: Optional[int] = None,
+                  end: Optional[int] = None, update: bool = True) -> Dict[str, np.ndarray]:
+        """Candles with start <= open time <= end (epoch seconds).
+
+        With update=True the missing parts of the range are fetched first.
+        Returns a dict of columns; 'timestamp' is exposed as datetime64[s]
+        like PortfolioHistory.get_range(), empty if nothing is available.
+        """
+        if update:
+            self.update(source, symbol, interval, start, end)
+        series_dir = self._series_dir(source, symbol, interval)
+        data = self._read(series_dir, self._load_manifest(series_dir), start, end)
+        if not len(data['timestamp']):
+            return {}
+        return dict(data, timestamp=data['timestamp'].view('datetime64[s]'))
+
+    def get_closes(self, source: str, symbol: str, interval: str, start: Optional[int] = None,
+                   end: Optional[int] = None, update: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """(open times in epoch seconds, closes) for a range, empty arrays if unavailable"""
+        data = self.get_range(source, symbol, interval, start, end, update)
+        if not data:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        return data['timestamp'].view(np.int64), data['close']
@@ -0,0 +1,43 @@
+"""
+CSV export of stored records, written in chunks
+"""
+import csv
+import io
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Column order of transaction exports; unknown keys are appended after these
+TRANSACTION_FIELDS = ['id', 'date', 'exchange', 'asset', 'type', 'amount', 'price_usd', 'value_usd']
+
+# Rows formatted per chunk before the text is handed on
+CHUNK_ROWS = 1000
+
+
+def iter_csv_chunks(rows: Iterable[Dict], fields: List[str], chunk_rows: int = CHUNK_ROWS) -> Iterator[str]:
+    """CSV text in pieces of `chunk_rows` rows, header first.
+
+    Rows are read straight from the iterable, so nothing but the current
+    chunk is held besides the caller's own records.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore', lineterminator='\n')
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def transactions_csv(transactions: List[Dict], fields: Optional[List[str]] = None) -> bytes:
+    """All transactions as UTF-8 CSV bytes"""
+    if fields is None:
+        extra = {}
+        for transaction in transactions:
+            extra.update(dict.fromkeys(key for key in transaction if key not in TRANSACTION_FIELDS))
+        fields = TRANSACTION_FIELDS + list(extra)
+    return ''.join(iter_csv_chunks(transactions, fields)).encode('utf-8')
@@ -0,0 +1,88 @@
+"""
+Dashboard view model - every aggregate of the summary page in one pass
+"""
+from typing import Dict, List
+
+from investment_returns import cash_flows, time_weighted_return, money_weighted_returns
+from utils import calculate_diversification
+
+# Exchanges PortfolioTracker polls - what a history snapshot's value_usd is made of
+CRYPTO_EXCHANGES = {'Binance', 'Bybit'}
+STOCK_EXCHANGES = {'XTB'}
+
+
+def view_model_key(portfolio_version, transaction_history, portfolio_history, fx) -> tuple:
+    """Versions of everything the view model is derived from.
+
+    Two equal keys mean the model would come out the same, so it only has
+    to be rebuilt when new portfolios are loaded, transactions are saved,
+    a snapshot is written or a new FX table arrives. `portfolio_version`
+    must be read together with the portfolios the model is built from.
+    """
+    return (portfolio_version, transaction_history.version, portfolio_history.version, fx.fetched_at)
+
+
+def build_view_model(portfolios: List[Dict], transaction_history, portfolio_history) -> Dict:
+    """Totals, PNL, returns and chart frames of the dashboard (all in USD)"""
+    transactions = transaction_history.transactions
+
+    # One PNL pass; the crypto/stock figures are split from it by exchange
+    all_pnl = transaction_history.get_all_pnl(portfolios)
+    total_pnl = sum(p['pnl'] for p in all_pnl)
+    total_invested = sum(p['invested'] for p in all_pnl)
+
+    values_by_type = {'crypto': 0.0, 'stocks': 0.0}
+    pnl_by_type = {'crypto': 0.0, 'stocks': 0.0}
+    allocation = []
+    current_values = {}
+    for portfolio in portfolios:
+        exchange = portfolio['exchange']
+        asset_type = 'crypto' if exchange in CRYPTO_EXCHANGES else 'stocks' if exchange in STOCK_EXCHANGES else None
+        if asset_type:
+            values_by_type[asset_type] += portfolio['total_value_usdt']
+        if portfolio['total_value_usdt'] > 0:
+            allocation.append({'Exchange': exchange, 'Value': portfolio['total_value_usdt']})
+        for balance in portfolio['balances']:
+            current_values[(exchange, balance['asset'])] = balance.get('value_usdt', 0)
+    for pnl in all_pnl:
+        if pnl['exchange'] in CRYPTO_EXCHANGES:
+            pnl_by_type['crypto'] += pnl['pnl']
+        elif pnl['exchange'] in STOCK_EXCHANGES:
+            pnl_by_type['stocks'] += pnl['pnl']
+
+    # Returns that account for deposits/withdrawals instead of raw value ratios.
+    # The history only holds the tracked exchanges, so flows and values are
+    # limited to them (manual stock trades are not part of value_usd)
+    tracked = [t for t in transactions if t.get('exchange') in CRYPTO_EXCHANGES]
+    tracked_values = {key: value for key, value in current_values.items() if key[0] in CRYPTO_EXCHANGES}
+    all_history = portfolio_history.get_chart_data(days=0)
+    twr = None
+    if all_history:
+        twr = time_weighted_return(all_history['timestamp'], all_history['value_usd'], *cash_flows(tracked))
+    mwr = money_weighted_returns(tracked, tracked_values)
+    irr_rows = sorted(
+        ({'Exchange': exchange, 'Asset': asset, 'IRR (% p.a.)': irr}
+         for (exchange, asset), irr in mwr['positions'].items()),
+        key=lambda row: row['IRR (% p.a.)'], reverse=True
+    )
+
+    total_value_usd = sum(p['total_value_usdt'] for p in portfolios)
+    return {
+        'total_value_usd': total_value_usd,
+        'all_pnl': all_pnl,
+        'total_pnl': total_pnl,
+        'total_invested': total_invested,
+        'total_pnl_percent': (total_pnl / total_invested * 100) if total_invested > 0 else 0,
+        'active_exchanges': len(allocation),
+        'total_assets': sum(len(p['balances']) for p in portfolios),
+        'twr': twr,
+        'mwr': mwr,
+        'irr_rows': irr_rows,
+        'diversification': calculate_diversification(portfolios),
+        'allocation': allocation,
+        'history_30d': portfolio_history.get_chart_data(days=30),
+        'crypto_value': values_by_type['crypto'],
+        'stocks_value': values_by_type['stocks'],
+        'crypto_pnl': pnl_by_type['crypto'],
+        'stocks_pnl': pnl_by_type['stocks'],
+    }
@@ -1,9 +1,21 @@
 """
 Exchange API clients module
+
+Clients are imported on first access so that importing the package does
+not load python-binance / pybit.
 """
-from .binance_client import BinanceClient
-from .bybit_client import BybitClient
-from .xtb_client import XTBClient
+from importlib import import_module
+
+_CLIENTS = {
+    'BinanceClient': '.binance_client',
+    'BybitClient': '.bybit_client',
+    'XTBClient': '.xtb_client',
+}
+
+__all__ = list(_CLIENTS)
 
-__all__ = ['BinanceClient', 'BybitClient', 'XTBClient']
 
+def __getattr__(name):
+    if name in _CLIENTS:
+        return getattr(import_module(_CLIENTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,8 +2,6 @@
 Binance API client for portfolio tracking
 """
 import time
-from binance.client import Client
-from binance.exceptions import BinanceAPIException
 from config import Config
 
 class BinanceClient:
@@ -15,13 +13,26 @@ class BinanceClient:
         if not Config.BINANCE_API_KEY or not Config.BINANCE_SECRET_KEY:
             raise ValueError("Binance API credentials not configured")
         
-        self.client = Client(
-            api_key=Config.BINANCE_API_KEY,
-            api_secret=Config.BINANCE_SECRET_KEY
-        )
+        self._client = None
+    
+    @property
+    def client(self):
+        """python-binance Client, created on first use.
+
+        Both the import and the constructor are slow (the constructor pings
+        the server), so neither happens until a request is actually made.
+        """
+        if self._client is None:
+            from binance.client import Client
+            self._client = Client(
+                api_key=Config.BINANCE_API_KEY,
+                api_secret=Config.BINANCE_SECRET_KEY
+            )
+        return self._client
     
     def _make_request_with_retry(self, func, max_retries=5, base_delay=2):
         """Make API request with exponential backoff retry logic and better error handling"""
+        from binance.exceptions import BinanceAPIException
         for attempt in range(max_retries):
             try:
                 return func()
@@ -2,8 +2,6 @@
 Bybit API client for portfolio tracking
 """
 import time
-from pybit.unified_trading import HTTP
-from pybit.exceptions import FailedRequestError
 from config import Config
 
 class BybitClient:
@@ -15,14 +13,23 @@ class BybitClient:
         if not Config.BYBIT_API_KEY or not Config.BYBIT_SECRET_KEY:
             raise ValueError("Bybit API credentials not configured")
         
-        self.session = HTTP(
-            testnet=False,
-            api_key=Config.BYBIT_API_KEY,
-            api_secret=Config.BYBIT_SECRET_KEY
-        )
+        self._session = None
+    
+    @property
+    def session(self):
+        """pybit HTTP session, created (and pybit imported) on first use"""
+        if self._session is None:
+            from pybit.unified_trading import HTTP
+            self._session = HTTP(
+                testnet=False,
+                api_key=Config.BYBIT_API_KEY,
+                api_secret=Config.BYBIT_SECRET_KEY
+            )
+        return self._session
     
     def _make_request_with_retry(self, func, max_retries=3, base_delay=1):
         """Make API request with exponential backoff retry logic and better error handling"""
+        from pybit.exceptions import FailedRequestError
         for attempt in range(max_retries):
             try:
                 return func()
@@ -5,6 +5,7 @@ Note: XTB uses xStation API (JSON-RPC)
 import requests
 import hashlib
 from config import Config
+from fx_rates import fx_rates
 
 class XTBClient:
     """Client for interacting with XTB API"""
@@ -126,16 +127,18 @@ class XTBClient:
             margin = margin_data.get('margin', 0)
             free_margin = margin_data.get('marginFree', 0)
             
-            # XTB uses account currency (typically USD or EUR)
+            # XTB reports everything in the account currency (USD, EUR, PLN...)
+            account_currency = margin_data.get('currency') or 'USD'
             balances.append({
-                'asset': 'USD',  # XTB typically uses USD
+                'asset': account_currency,
                 'free': free_margin,
                 'locked': margin,
-                'total': balance
+                'total': balance,
+                'value_usdt': fx_rates.to_usd(balance, account_currency)
             })
             
-            # Use equity as total value (balance + unrealized P/L)
-            total_value = equity
+            # Use equity as total value (balance + unrealized P/L), in USD
+            total_value = fx_rates.to_usd(equity, account_currency)
             
             return {
                 'balances': balances,
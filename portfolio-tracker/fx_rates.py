@@ -0,0 +1,167 @@
+"""
+Currency conversion with a cached rate table and locally derived cross rates
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+
+RATES_URL = 'https://api.exchangerate-api.com/v4/latest/USD'
+
+# Minor units Yahoo uses for some listings (LSE quotes in pence, JSE in cents)
+MINOR_UNITS = {
+    'GBp': ('GBP', 100),
+    'GBX': ('GBP', 100),
+    'ZAc': ('ZAR', 100),
+    'ILA': ('ILS', 100),
+}
+
+# Last-resort table when nothing was ever fetched (units per 1 USD)
+FALLBACK_RATES = {'USD': 1.0, 'PLN': 4.0}
+
+
+class FXRates:
+    """Process-wide table of rates against USD.
+
+    One request loads the whole table; any pair is derived locally as
+    rate(A -> B) = usd_rates[B] / usd_rates[A]. After `ttl` seconds a
+    daemon thread downloads a new table while conversions keep using the
+    current one (like StaleWhileRevalidate); only a process with no table
+    at all, not even on disk, waits for the first download. The last good
+    table is kept on disk, and `is_stale` tells the UI when values are
+    converted with an outdated table.
+    """
+
+    def __init__(self, ttl: int = 3600, cache_file: str = 'fx_rates.json', retries: int = 3,
+                 retry_after: int = 60):
+        self.ttl = ttl
+        self.cache_file = cache_file
+        self.retries = retries
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self.rates: Dict[str, float] = {}
+        self.fetched_at: Optional[float] = None  # epoch seconds of the current table
+        self._failed_at = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._load_cache()
+
+    def _load_cache(self):
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r') as f:
+                    data = json.load(f)
+                self.rates = data['rates']
+                self.fetched_at = data['fetched_at']
+            except:
+                print(f"Error loading {self.cache_file}, FX rates will be refetched")
+
+    def _save_cache(self):
+        """Save the table atomically"""
+        tmp_file = self.cache_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump({'rates': self.rates, 'fetched_at': self.fetched_at}, f, indent=2)
+        os.replace(tmp_file, self.cache_file)
+
+    def _fetch(self) -> Optional[Dict[str, float]]:
+        """Download the USD rate table, with exponential backoff"""
+        for attempt in range(self.retries):
+            try:
+                response = requests.get(RATES_URL, timeout=5)
+                if response.status_code == 200:
+                    rates = response.json().get('rates') or {}
+                    if rates:
+                        rates['USD'] = 1.0
+                        return rates
+            except Exception as e:
+                print(f"Error fetching FX rates: {e}")
+            if attempt < self.retries - 1:
+                time.sleep(0.5 * 2 ** attempt)
+        return None
+
+    def _load(self):
+        rates = self._fetch()
+        with self._lock:
+            if not rates:
+                self._failed_at = time.time()
+                if not self.rates:
+                    print("⚠️  FX rates unavailable, using fallback rates")
+                return
+            self.rates = rates
+            self.fetched_at = time.time()
+            try:
+                self._save_cache()
+            except OSError as e:
+                print(f"Error saving FX rates: {e}")
+
+    def _start_refresh(self):
+        """Start a background download unless one is already running (lock held)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._load, name='fx-refresh', daemon=True)
+        self._thread.start()
+
+    def refresh(self, force: bool = False, wait: bool = False):
+        """Download a new table in the background once the current one expired.
+
+        force starts the download regardless of age, wait blocks until it
+        has finished. A failed download is retried after `retry_after` seconds.
+        """
+        now = time.time()
+        with self._lock:
+            expired = self.fetched_at is None or now - self.fetched_at >= self.ttl
+            if not force and not (expired and now - self._failed_at >= self.retry_after):
+                return
+            # Nothing to convert with yet - the first download has to be waited for
+            wait = wait or (not self.rates and not self._failed_at)
+            self._start_refresh()
+            thread = self._thread
+        if wait:
+            thread.join()
+
+    @property
+    def age(self) -> Optional[float]:
+        """Seconds since the current table was fetched (None if never)"""
+        return None if self.fetched_at is None else time.time() - self.fetched_at
+
+    @property
+    def is_stale(self) -> bool:
+        """True when conversions use an expired table or the fallback rates"""
+        return self.fetched_at is None or self.age > self.ttl
+
+    def _usd_rate(self, currency: str) -> Optional[float]:
+        """Units of `currency` per 1 USD (minor units such as GBp handled)"""
+        factor = 1.0
+        if currency in MINOR_UNITS:
+            currency, factor = MINOR_UNITS[currency]
+        currency = currency.upper()
+        rate = (self.rates or FALLBACK_RATES).get(currency) or FALLBACK_RATES.get(currency)
+        return None if rate is None else rate * factor
+
+    def rate(self, from_currency: str, to_currency: str) -> Optional[float]:
+        """Cross rate: how many `to_currency` units one `from_currency` unit buys"""
+        if from_currency == to_currency:
+            return 1.0
+        self.refresh()
+        source, target = self._usd_rate(from_currency), self._usd_rate(to_currency)
+        if not source or not target:
+            return None
+        return target / source
+
+    def convert(self, amount: float, from_currency: str, to_currency: str = 'USD') -> Optional[float]:
+        """Convert an amount (None if either currency is unknown)"""
+        rate = self.rate(from_currency or 'USD', to_currency)
+        return None if rate is None else amount * rate
+
+    def to_usd(self, amount: float, currency: Optional[str]) -> float:
+        """Convert to USD, leaving the amount unchanged for unknown currencies"""
+        converted = self.convert(amount, currency or 'USD', 'USD')
+        if converted is None:
+            print(f"Unknown currency {currency}, treating the amount as USD")
+            return amount
+        return converted
+
+
+fx_rates = FXRates()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Reconstruct historical portfolio value from transactions and daily closes
+"""
+import argparse
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from candle_store import CandleStore
+from dashboard_model import CRYPTO_EXCHANGES
+from investment_returns import to_epoch
+from nbp_rates import get_nbp_rates
+from portfolio_data import STABLECOINS
+from portfolio_history import PortfolioHistory, history_lock
+from stock_prices import get_spark_history
+from transaction_history import TransactionHistory
+from utils import get_usd_to_pln_rate
+
+DAY = 24 * 60 * 60
+
+# Stock trades are entered by hand on the stocks page
+STOCK_EXCHANGE = 'Manual'
+
+# Signed effect of a transaction on the held quantity
+QUANTITY_SIGNS = {
+    'buy': 1.0,
+    'deposit': 1.0,
+    'sell': -1.0,
+    'withdrawal': -1.0,
+}
+
+
+def replay_quantities(transactions: List[Dict], end: Optional[int] = None):
+    """Held quantity of every (exchange, asset) at the end of each day.
+
+    Transactions are scattered into a (days x positions) grid of signed
+    amounts and cumulated along the time axis, so the whole replay is two
+    NumPy calls regardless of how many days or trades there are.
+
+    Returns:
+        (days, positions, quantities, trade_prices) - day start epochs,
+        position keys, the quantity grid and a grid with the last trade
+        price on days that had a trade (NaN elsewhere)
+    """
+    rows = []
+    for t in transactions:
+        sign = QUANTITY_SIGNS.get(t.get('type'))
+        if sign is None or not t.get('date'):
+            continue
+        rows.append(((t.get('exchange'), t.get('asset')), to_epoch(t['date']),
+                     sign * t.get('amount', 0), t.get('price_usd', 0)))
+    if not rows:
+        return np.empty(0, dtype=np.int64), [], np.zeros((0, 0)), np.zeros((0, 0))
+
+    rows.sort(key=lambda row: row[1])
+    positions = sorted({row[0] for row in rows})
+    position_index = {key: i for i, key in enumerate(positions)}
+    columns = np.array([position_index[row[0]] for row in rows])
+    epochs = np.array([row[1] for row in rows], dtype=np.int64)
+
+    end = int(datetime.now().timestamp()) if end is None else end
+    first_day = epochs[0] - epochs[0] % DAY
+    days = np.arange(first_day, end - end % DAY + 1, DAY, dtype=np.int64)
+    day_rows = np.minimum((epochs - first_day) // DAY, len(days) - 1)
+
+    deltas = np.zeros((len(days), len(positions)))
+    np.add.at(deltas, (day_rows, columns), [row[2] for row in rows])
+    # Missing or partial history can make a position go below zero
+    quantities = np.maximum(np.cumsum(deltas, axis=0), 0.0)
+
+    trade_prices = np.full((len(days), len(positions)), np.nan)
+    # Rows are sorted by time, so the last trade of a day wins
+    trade_prices[day_rows, columns] = [row[3] or np.nan for row in rows]
+    return days, positions, quantities, trade_prices
+
+
+def forward_fill(grid):
+    """Carry the last non-NaN value of each column forwards (NaN before the first)"""
+    valid = ~np.isnan(grid)
+    index = np.where(valid, np.arange(len(grid))[:, None], 0)
+    np.maximum.accumulate(index, axis=0, out=index)
+    filled = grid[index, np.arange(grid.shape[1])]
+    filled[~np.maximum.accumulate(valid, axis=0)] = np.nan
+    return filled
+
+
+# Yahoo spark ranges and the number of days each one covers
+SPARK_PERIODS = [('1mo', 31), ('3mo', 92), ('6mo', 183), ('1y', 366), ('2y', 731), ('5y', 1827), ('10y', 3653)]
+
+
+def _spark_period(seconds: int) -> str:
+    """Shortest Yahoo range reaching `seconds` into the past"""
+    for period, days in SPARK_PERIODS:
+        if seconds <= days * DAY:
+            return period
+    return 'max'
+
+
+def daily_closes(positions: List[Tuple[str, str]], start: int, end: int) -> Dict[Tuple[str, str], Tuple]:
+    """(epochs, closes in USD) per position, missing keys if unavailable.
+
+    Manually entered stocks come from batched Yahoo spark requests (20
+    symbols each), crypto from the local candle store using the ASSET/USDT
+    pair on Binance (also for Bybit holdings).
+    """
+    closes = {}
+    stocks = [asset for exchange, asset in positions if exchange == STOCK_EXCHANGE]
+    if stocks:
+        history = get_spark_history(stocks, period=_spark_period(int(datetime.now().timestamp()) - start))
+        closes.update({(STOCK_EXCHANGE, asset): history[asset] for asset in stocks if asset in history})
+
+    store = CandleStore()
+    for exchange, asset in positions:
+        if exchange != STOCK_EXCHANGE:
+            closes[(exchange, asset)] = store.get_closes('binance', f"{asset}USDT", '1d', start, end)
+    return closes
+
+
+def price_grid(days, positions, trade_prices, fetch=daily_closes):
+    """(days x positions) USD prices: daily closes, trade prices where no close exists"""
+    prices = trade_prices.copy()
+    if not len(days):
+        return prices
+    priced = [key for key in positions if key[1] not in STABLECOINS]
+    closes = fetch(priced, int(days[0]), int(days[-1])) if priced else {}
+    for column, key in enumerate(positions):
+        if key[1] in STABLECOINS:
+            prices[:, column] = 1.0
+            continue
+        times, values = closes.get(key, (np.empty(0, dtype=np.int64), np.empty(0)))
+        ok = ~np.isnan(values)
+        rows = (times[ok] - times[ok] % DAY - days[0]) // DAY
+        inside = (rows >= 0) & (rows < len(days))
+        prices[rows[inside], column] = values[ok][inside]
+    return forward_fill(prices)
+
+
+def reconstruct(transactions: List[Dict], end: Optional[int] = None, fetch=daily_closes) -> Optional[Dict]:
+    """Daily total and per-position values implied by the transaction log"""
+    days, positions, quantities, trade_prices = replay_quantities(transactions, end)
+    if not len(days):
+        return None
+    prices = price_grid(days, positions, trade_prices, fetch)
+    values = np.nan_to_num(quantities * prices)
+    return {
+        'timestamp': days,
+        'positions': positions,
+        'quantity': quantities,
+        'value_usd_by_position': values,
+        'value_usd': values.sum(axis=1),
+    }
+
+
+def historical_usd_to_pln(timestamps: np.ndarray) -> np.ndarray:
+    """NBP USD rate in effect on each day, today's rate where no table is known"""
+    days = np.asarray(timestamps, dtype='datetime64[s]').astype('datetime64[D]')
+    nbp = get_nbp_rates()
+    nbp.ensure(days.min().astype(object), days.max().astype(object))
+    rates = nbp.lookup('USD', days, previous_business_day=False)
+    return np.where(np.isnan(rates), get_usd_to_pln_rate(), rates)
+
+
+def backfill_history(data_dir: str = 'portfolio_history',
+                     transactions: Optional[List[Dict]] = None, fetch=daily_closes) -> int:
+    """Write the reconstructed curve into the history store; returns days written.
+
+    Only exchanges the collector records are replayed, so the curve joins
+    the live snapshots without a jump. The slow price downloads happen
+    first. The store is opened only after them, under the writers' lock,
+    so snapshots the collector recorded in the meantime are kept.
+    """
+    transactions = TransactionHistory().transactions if transactions is None else transactions
+    transactions = [t for t in transactions if t.get('exchange') in CRYPTO_EXCHANGES]
+    curve = reconstruct(transactions, fetch=fetch)
+    if curve is None:
+        return 0
+    values_pln = curve['value_usd'] * historical_usd_to_pln(curve['timestamp'])
+
+    with history_lock(data_dir):
+        return PortfolioHistory(data_dir).backfill(
+            curve['timestamp'],
+            curve['value_usd'],
+            values_pln,
+            positions=curve['positions'],
+            quantities=curve['quantity'],
+            position_values=curve['value_usd_by_position']
+        )
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Rebuild portfolio history from the transaction log")
+    parser.parse_args()
+
+    days = backfill_history()
+    if days:
+        print(f"✅ Backfilled {days} days of portfolio history")
+    else:
+        print("ℹ️  Nothing to backfill (no transactions before the first snapshot)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Portfolio history charts with LTTB downsampling
+"""
+import numpy as np
+
+# Plot area width the history charts are drawn at
+CHART_WIDTH_PX = 1200
+
+# A line segment narrower than this many pixels is not visible anyway
+PIXELS_PER_POINT = 2
+
+# Series longer than this (before downsampling) are drawn with WebGL
+SCATTERGL_THRESHOLD = 2000
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-triangle-three-buckets downsampling.
+
+    Returns the indices of at most `threshold` points that keep the visual
+    shape of the series (peaks and dips survive, unlike plain striding).
+    First and last points are always kept.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket i spans edges[i]:edges[i + 1]; the first and last point are their own buckets
+    edges = (np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        # Twice the triangle area between the last kept point, each candidate and the next bucket's mean
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def history_figure_json(history_data: dict, value_column: str, currency: str,
+                        width_px: int = CHART_WIDTH_PX) -> str:
+    """Plotly figure JSON of the portfolio value line, downsampled to the chart width"""
+    import plotly.graph_objects as go
+
+    timestamps = history_data['timestamp']
+    values = np.asarray(history_data[value_column], dtype=np.float64)
+    keep = lttb(timestamps.astype('datetime64[s]').astype(np.int64), values, width_px // PIXELS_PER_POINT)
+    # Cents are enough for the plot and keep the JSON small
+    timestamps, sampled = timestamps[keep], np.round(values[keep], 2)
+
+    # SVG is fine for short series; WebGL keeps long ones responsive
+    large = len(values) > SCATTERGL_THRESHOLD
+    trace = go.Scattergl if large else go.Scatter
+    fig = go.Figure()
+    fig.add_trace(trace(
+        x=timestamps,
+        y=sampled,
+        mode='lines' if large else 'lines+markers',
+        name='Portfolio Value',
+        line=dict(color='#2563eb', width=3),
+        marker=dict(size=4),
+        fill='tonexty',
+        fillcolor='rgba(37, 99, 235, 0.1)'
+    ))
+
+    # Calculate dynamic Y-axis range for better visualization
+    y_min = float(values.min())
+    y_max = float(values.max())
+    y_range = y_max - y_min
+    padding = max(y_range * 0.1, y_max * 0.01)  # 10% padding or 1% of max
+
+    fig.update_layout(
+        height=400,
+        showlegend=False,
+        xaxis_title="Date",
+        yaxis_title=f"Value ({currency})",
+        yaxis=dict(
+            range=[y_min - padding, y_max + padding],
+            fixedrange=False
+        ),
+        hovermode='x unified',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(size=12),
+        margin=dict(l=60, r=40, t=40, b=60)
+    )
+    return fig.to_json()
@@ -0,0 +1,248 @@
+"""
+Offline instrument master: symbol / name / ISIN search without API calls
+"""
+import csv
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+SEED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instruments_seed.csv')
+
+# NASDAQ Trader symbol directories (every US-listed security, refreshed daily)
+NASDAQ_LISTED_URL = 'https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt'
+OTHER_LISTED_URL = 'https://www.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt'
+OTHER_EXCHANGES = {'A': 'NYSE American', 'N': 'NYSE', 'P': 'NYSE Arca', 'Z': 'Cboe BZX', 'V': 'IEX'}
+
+FIELDS = ['symbol', 'name', 'exchange', 'isin']
+
+# Matches kept per trie node - enough for a type-ahead dropdown
+NODE_LIMIT = 20
+
+# Name words are indexed up to this many characters; longer queries are
+# answered by filtering that node and the trigram index
+WORD_DEPTH = 6
+
+
+def is_valid_isin(isin: str) -> bool:
+    """Check ISIN format and its Luhn check digit"""
+    if not re.fullmatch(r'[A-Z]{2}[A-Z0-9]{9}[0-9]', isin or ''):
+        return False
+    digits = ''.join(str(int(c, 36)) for c in isin[:-1])
+    total = 0
+    for i, digit in enumerate(reversed(digits)):
+        n = int(digit)
+        if i % 2 == 0:
+            n *= 2
+            if n > 9:
+                n -= 9
+        total += n
+    return (10 - total % 10) % 10 == int(isin[-1])
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r'[^A-Z0-9]+', ' ', text.upper()).strip()
+
+
+def _ngrams(text: str, n: int = 3):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class InstrumentMaster:
+    """In-memory index over a CSV of instruments (symbol, name, exchange, isin).
+
+    - prefix tries over symbols and over name words, each node keeps its
+      best NODE_LIMIT matches so type-ahead is O(length of the query)
+    - trigram index over normalized names for matches inside a word
+    - dict indexes for exact symbol and ISIN lookups
+
+    The user's instruments.csv (written by refresh()) is used when present,
+    otherwise the bundled seed list. ISINs come only from the seed list and
+    from rows added to the file by hand: the NASDAQ Trader directories used
+    by refresh() carry none, so refreshed US listings are searchable by
+    symbol and name but not by ISIN.
+    """
+
+    def __init__(self, path: str = 'instruments.csv'):
+        self.path = path
+        self.instruments: List[Dict[str, str]] = []
+        self.by_symbol: Dict[str, int] = {}
+        self.by_isin: Dict[str, int] = {}
+        self._symbol_trie = {}
+        self._word_trie = {}
+        self._trigrams: Dict[str, List[int]] = {}
+        self.load()
+
+    def load(self):
+        """Load the instrument file and rebuild all indexes"""
+        source = self.path if os.path.exists(self.path) else SEED_FILE
+        try:
+            with open(source, 'r', newline='', encoding='utf-8') as f:
+                rows = [row for row in csv.DictReader(f) if row.get('symbol')]
+        except OSError as e:
+            print(f"Error loading instruments from {source}: {e}")
+            rows = []
+        self._build(rows)
+
+    def _build(self, rows):
+        # Short symbols first: 'V' should come before 'VOO' for the query 'V'
+        rows = sorted(rows, key=lambda row: (len(row['symbol']), row['symbol']))
+        self.instruments = [{field: (row.get(field) or '').strip() for field in FIELDS} for row in rows]
+        self.by_symbol, self.by_isin, self._trigrams = {}, {}, {}
+        self._symbol_trie, self._word_trie = {}, {}
+
+        for index, instrument in enumerate(self.instruments):
+            symbol = instrument['symbol'].upper()
+            self.by_symbol.setdefault(symbol, index)
+            if instrument['isin']:
+                # Several listings share an ISIN; the first (shortest symbol) wins
+                self.by_isin.setdefault(instrument['isin'].upper(), index)
+
+            name = _normalize(instrument['name'])
+            self._insert(self._symbol_trie, symbol, index)
+            for word in name.split():
+                self._insert(self._word_trie, word[:WORD_DEPTH], index)
+            for gram in _ngrams(name):
+                self._trigrams.setdefault(gram, []).append(index)
+
+    @staticmethod
+    def _insert(trie, key: str, index: int):
+        node = trie
+        for char in key:
+            node = node.setdefault(char, {})
+            matches = node.setdefault('', [])
+            if len(matches) < NODE_LIMIT and (not matches or matches[-1] != index):
+                matches.append(index)
+
+    @staticmethod
+    def _prefix(trie, prefix: str) -> List[int]:
+        node = trie
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        return node.get('', [])
+
+    def _substring(self, text: str) -> List[int]:
+        """Instruments whose normalized name contains `text` (trigram candidates, then verified)"""
+        grams = _ngrams(text)
+        if not grams:
+            return []
+        postings = sorted((self._trigrams.get(gram, []) for gram in grams), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+        return sorted(i for i in candidates if text in _normalize(self.instruments[i]['name']))
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, str]]:
+        """Type-ahead search: exact symbol, symbol/name-word prefix, then name substring"""
+        text = _normalize(query)
+        if not text:
+            return []
+        symbol = query.strip().upper()
+        by_symbol = self._prefix(self._symbol_trie, symbol)
+        exact = self.by_symbol.get(symbol)
+        if exact is not None:
+            by_symbol = [exact] + by_symbol
+
+        first_word = text.split()[0]
+        by_name = self._prefix(self._word_trie, first_word[:WORD_DEPTH])
+        if ' ' in text or len(first_word) > WORD_DEPTH:
+            # The trie only saw the start of the query - verify against the name
+            by_name = [i for i in by_name if (' ' + text) in (' ' + _normalize(self.instruments[i]['name']))]
+        if len(by_symbol) + len(by_name) < limit:
+            by_name = by_name + self._substring(text)
+
+        results = []
+        for index in dict.fromkeys(by_symbol + by_name):
+            instrument = self.instruments[index]
+            results.append((instrument['symbol'], instrument['name']))
+            if len(results) >= limit:
+                break
+        return results
+
+    def get(self, symbol: str) -> Optional[Dict[str, str]]:
+        """Instrument by exact symbol"""
+        index = self.by_symbol.get(symbol.strip().upper())
+        return None if index is None else self.instruments[index]
+
+    def find_isin(self, isin: str) -> Optional[Dict[str, str]]:
+        """Instrument by ISIN (None for unknown or malformed ISINs)"""
+        isin = isin.strip().upper()
+        if not is_valid_isin(isin):
+            return None
+        index = self.by_isin.get(isin)
+        return None if index is None else self.instruments[index]
+
+    def __len__(self):
+        return len(self.instruments)
+
+    def __contains__(self, symbol):
+        return symbol.strip().upper() in self.by_symbol
+
+    @staticmethod
+    def _fetch_nasdaq_trader() -> List[Dict[str, str]]:
+        """All US listings from the NASDAQ Trader symbol directories (no ISINs)"""
+        rows = []
+        for url, symbol_field, exchange_of in (
+            (NASDAQ_LISTED_URL, 'Symbol', lambda row: 'NASDAQ'),
+            (OTHER_LISTED_URL, 'ACT Symbol', lambda row: OTHER_EXCHANGES.get(row['Exchange'], row['Exchange'])),
+        ):
+            response = requests.get(url, timeout=30)
+            response.raise_for_status()
+            lines = [line for line in response.text.splitlines() if not line.startswith('File Creation Time')]
+            for row in csv.DictReader(lines, delimiter='|'):
+                symbol = row.get(symbol_field) or ''
+                if row.get('Test Issue') == 'Y' or not symbol or '$' in symbol:
+                    continue
+                rows.append({
+                    # Yahoo writes share classes with a dash: BRK.B -> BRK-B
+                    'symbol': symbol.replace('.', '-'),
+                    'name': row.get('Security Name', ''),
+                    'exchange': exchange_of(row),
+                    'isin': ''
+                })
+        return rows
+
+    def refresh(self) -> int:
+        """Download current US listings, merge them with the known ones and save.
+
+        ISINs and non-US listings already in the file are kept. Returns the
+        number of instruments after the refresh.
+        """
+        merged = {instrument['symbol']: dict(instrument) for instrument in self.instruments}
+        for row in self._fetch_nasdaq_trader():
+            known = merged.get(row['symbol'])
+            if known:
+                known['name'] = row['name'] or known['name']
+                known['exchange'] = row['exchange'] or known['exchange']
+            else:
+                merged[row['symbol']] = row
+
+        tmp_file = self.path + '.tmp'
+        with open(tmp_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(merged.values())
+        os.replace(tmp_file, self.path)
+        self._build(list(merged.values()))
+        return len(self.instruments)
+
+
+_master = None
+
+
+def get_instrument_master() -> InstrumentMaster:
+    """Shared instance, indexes are built on first use"""
+    global _master
+    if _master is None:
+        _master = InstrumentMaster()
+    return _master
+
+
+if __name__ == "__main__":
+    count = get_instrument_master().refresh()
+    print(f"✅ Instrument master refreshed: {count} instruments")
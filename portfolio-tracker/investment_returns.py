@@ -0,0 +1,213 @@
+"""
+Cash-flow-aware returns: time-weighted (TWR) and money-weighted (MWR / IRR)
+"""
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+SECONDS_PER_YEAR = 365.25 * 24 * 60 * 60
+
+# Sign of each transaction type as a flow INTO the portfolio
+FLOW_SIGNS = {
+    'buy': 1.0,
+    'deposit': 1.0,
+    'sell': -1.0,
+    'withdrawal': -1.0,
+}
+
+# Flows that cross the boundary of the exchange accounts. Buys and sells
+# are settled from / into the account's own USDT, which is part of the
+# measured value, so for the whole account they are internal
+EXTERNAL_FLOW_SIGNS = {
+    'deposit': 1.0,
+    'withdrawal': -1.0,
+}
+
+
+def to_epoch(value) -> int:
+    """Transaction date (ISO string, date or datetime) to epoch seconds"""
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    if isinstance(value, date):
+        return int(datetime(value.year, value.month, value.day).timestamp())
+    return int(datetime.fromisoformat(str(value)).timestamp())
+
+
+def cash_flows(transactions: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """External flows into the portfolio as (epoch seconds, signed USD amounts), sorted by time.
+
+    Only deposits and withdrawals count, see EXTERNAL_FLOW_SIGNS. Until
+    those are recorded, money arriving on an exchange shows up as return.
+    """
+    times, amounts = [], []
+    for t in transactions:
+        sign = EXTERNAL_FLOW_SIGNS.get(t.get('type'))
+        if sign is None or not t.get('date'):
+            continue
+        value = t.get('value_usd', t.get('amount', 0) * t.get('price_usd', 0))
+        times.append(to_epoch(t['date']))
+        amounts.append(sign * value)
+    times = np.array(times, dtype=np.int64)
+    amounts = np.array(amounts, dtype=np.float64)
+    order = np.argsort(times, kind='stable')
+    return times[order], amounts[order]
+
+
+def time_weighted_return(timestamps, values, flow_times, flow_amounts) -> Optional[Dict]:
+    """Chain sub-period returns, splitting the value history at every cash flow.
+
+    Args:
+        timestamps: Sorted snapshot times (epoch seconds or datetime64)
+        values: Portfolio value at each snapshot
+        flow_times: Sorted cash-flow times (epoch seconds)
+        flow_amounts: Flow into the portfolio at each time (negative = out)
+
+    A flow is assumed to happen right after the last snapshot before it, so
+    each sub-period runs from (value + flow) to the value just before the
+    next flow. Flows between the same two snapshots are merged.
+
+    Returns:
+        dict with total and annualized TWR in percent, or None. The
+        annualized figure is None for histories shorter than a year, where
+        extrapolating a short return to a yearly rate would be misleading.
+    """
+    timestamps = np.asarray(timestamps).astype('datetime64[s]').astype(np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < 2:
+        return None
+
+    flow_times = np.asarray(flow_times, dtype=np.int64)
+    flow_amounts = np.asarray(flow_amounts, dtype=np.float64)
+    inside = (flow_times > timestamps[0]) & (flow_times <= timestamps[-1])
+    flow_times, flow_amounts = flow_times[inside], flow_amounts[inside]
+
+    # Snapshot index just before each flow; merge flows sharing that snapshot
+    before = np.searchsorted(timestamps, flow_times, side='left') - 1
+    split_at, first = np.unique(before, return_index=True)
+    merged_flows = np.add.reduceat(flow_amounts, first) if len(first) else np.empty(0)
+
+    starts = np.r_[values[0], values[split_at] + merged_flows]
+    ends = np.r_[values[split_at], values[-1]]
+    valid = starts > 0
+    growth = float(np.prod(ends[valid] / starts[valid]))
+
+    years = (timestamps[-1] - timestamps[0]) / SECONDS_PER_YEAR
+    total = growth - 1.0
+    annualized = growth ** (1.0 / years) - 1.0 if years >= 1 and growth > 0 else None
+    return {
+        'twr_pct': total * 100,
+        'twr_annualized_pct': None if annualized is None else annualized * 100,
+        'periods': int(valid.sum()),
+    }
+
+
+def batch_irr(cashflows, times, guess: float = 0.1, max_iter: int = 100, tol: float = 1e-9) -> np.ndarray:
+    """Solve the IRR of many cash-flow series at once with vectorized Newton.
+
+    Args:
+        cashflows: (positions x dates) matrix, negative = money invested,
+            positive = money received / current value
+        times: (dates,) time of each column in years from any common origin
+
+    Returns:
+        (positions,) annual IRR as a fraction, NaN where it does not exist
+        (no sign change). Rows where Newton diverges are re-solved by
+        bisection.
+    """
+    cashflows = np.atleast_2d(np.asarray(cashflows, dtype=np.float64))
+    times = np.asarray(times, dtype=np.float64)[None, :]
+    rates = np.full(cashflows.shape[0], guess)
+    active = np.ones(cashflows.shape[0], dtype=bool)
+
+    with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+        for _ in range(max_iter):
+            if not active.any():
+                break
+            growth = 1.0 + rates[active, None]
+            discount = growth ** -times
+            npv = (cashflows[active] * discount).sum(axis=1)
+            slope = (-times * cashflows[active] * discount / growth).sum(axis=1)
+            step = np.where(slope != 0, npv / slope, 0.0)
+            new_rates = np.maximum(rates[active] - step, -0.9999)
+            rates[active] = new_rates
+            converged = ~np.isfinite(new_rates) | (np.abs(step) < tol)
+            active[np.flatnonzero(active)[converged]] = False
+
+    has_sign_change = (cashflows > 0).any(axis=1) & (cashflows < 0).any(axis=1)
+    with np.errstate(over='ignore', invalid='ignore'):
+        residual = np.abs((cashflows * (1.0 + rates[:, None]) ** -times).sum(axis=1))
+    scale = np.abs(cashflows).sum(axis=1)
+    failed = (active | ~(residual <= 1e-6 * scale)) & has_sign_change
+    if failed.any():
+        # Newton overshoots for deeply negative IRRs - fall back to bisection
+        rates[failed] = _batch_bisect_irr(cashflows[failed], times)
+    rates[~has_sign_change | ~np.isfinite(rates)] = np.nan
+    return rates
+
+
+def _batch_bisect_irr(cashflows, times, low: float = -0.9999, high: float = 100.0, iterations: int = 100):
+    """Vectorized bisection on rows whose NPV changes sign between low and high"""
+    def npv(rates):
+        with np.errstate(over='ignore', invalid='ignore'):
+            return (cashflows * (1.0 + rates[:, None]) ** -times).sum(axis=1)
+
+    lows = np.full(cashflows.shape[0], low)
+    highs = np.full(cashflows.shape[0], high)
+    npv_low = npv(lows)
+    bracketed = np.sign(npv_low) * np.sign(npv(highs)) < 0
+    for _ in range(iterations):
+        mids = (lows + highs) / 2
+        npv_mid = npv(mids)
+        same_side = np.sign(npv_mid) == np.sign(npv_low)
+        lows = np.where(same_side, mids, lows)
+        npv_low = np.where(same_side, npv_mid, npv_low)
+        highs = np.where(same_side, highs, mids)
+    return np.where(bracketed, (lows + highs) / 2, np.nan)
+
+
+def money_weighted_returns(transactions: List[Dict], current_values: Dict[Tuple[str, str], float],
+                           now: Optional[int] = None) -> Dict:
+    """Per-position and whole-portfolio IRR from transactions plus current values.
+
+    Builds one (positions x dates) cash-flow matrix (buys negative, sells
+    positive, current value as a final positive flow at `now`) and solves
+    every row in one batched Newton iteration. The last row is the sum of
+    all positions, i.e. the MWR of the money put into positions (cash
+    held as USDT without transactions is not part of it).
+
+    Returns:
+        {'portfolio': pct or None, 'positions': {(exchange, asset): pct}}
+    """
+    now = int(datetime.now().timestamp()) if now is None else now
+    keys, times, amounts = [], [], []
+    for t in transactions:
+        sign = FLOW_SIGNS.get(t.get('type'))
+        if sign is None or not t.get('date'):
+            continue
+        keys.append((t.get('exchange'), t.get('asset')))
+        times.append(to_epoch(t['date']))
+        # Investor's view: money into the portfolio is a negative cash flow
+        amounts.append(-sign * t.get('value_usd', t.get('amount', 0) * t.get('price_usd', 0)))
+
+    if not keys:
+        return {'portfolio': None, 'positions': {}}
+
+    positions = sorted(set(keys))
+    position_index = {key: i for i, key in enumerate(positions)}
+    dates, date_index = np.unique(np.r_[np.array(times, dtype=np.int64), now], return_inverse=True)
+
+    matrix = np.zeros((len(positions) + 1, len(dates)))
+    rows = np.array([position_index[key] for key in keys])
+    np.add.at(matrix, (rows, date_index[:-1]), amounts)
+    for key, value in current_values.items():
+        if key in position_index:
+            matrix[position_index[key], date_index[-1]] += value
+    matrix[-1] = matrix[:-1].sum(axis=0)
+
+    years = (dates - dates[0]) / SECONDS_PER_YEAR
+    irr = batch_irr(matrix, years) * 100
+    return {
+        'portfolio': None if np.isnan(irr[-1]) else float(irr[-1]),
+        'positions': {key: float(irr[i]) for i, key in enumerate(positions) if not np.isnan(irr[i])},
+    }
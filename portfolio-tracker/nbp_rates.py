@@ -0,0 +1,186 @@
+"""
+Historical NBP exchange rates (table A) for PLN tax calculations
+"""
+import os
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import requests
+
+NBP_TABLES_URL = 'https://api.nbp.pl/api/exchangerates/tables/A/{start}/{end}/?format=json'
+
+# The NBP API answers at most 93 days per query
+MAX_QUERY_DAYS = 93
+
+
+def fetch_nbp_tables(start: date, end: date) -> List[Dict]:
+    """Table A for every business day in [start, end] from the NBP API"""
+    tables = []
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(end, chunk_start + timedelta(days=MAX_QUERY_DAYS - 1))
+        url = NBP_TABLES_URL.format(start=chunk_start.isoformat(), end=chunk_end.isoformat())
+        response = requests.get(url, headers={'Accept': 'application/json'}, timeout=10)
+        if response.status_code == 200:
+            tables.extend(response.json())
+        elif response.status_code != 404:
+            # 404 only means no table was published in the range (holidays)
+            response.raise_for_status()
+        chunk_start = chunk_end + timedelta(days=1)
+    return tables
+
+
+class NBPRates:
+    """Local store of NBP average (mid) rates.
+
+    Every currency is a sorted datetime64[D] array of publication dates
+    with the matching mid rates, saved together in one .npz file. The
+    range already asked for is stored too, so weekends and holidays without
+    a table are not requested again; only days outside it are downloaded.
+    """
+
+    def __init__(self, data_file: str = 'nbp_rates.npz', fetch: Callable = fetch_nbp_tables):
+        self.data_file = data_file
+        self.fetch = fetch
+        self.dates: Dict[str, np.ndarray] = {}
+        self.mids: Dict[str, np.ndarray] = {}
+        self.checked: Optional[Tuple[date, date]] = None  # (first, last) day already queried
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.data_file):
+            return
+        try:
+            with np.load(self.data_file) as data:
+                for key in data.files:
+                    if key == 'checked':
+                        first, last = data[key].astype(object)
+                        self.checked = (first, last)
+                        continue
+                    code, column = key.rsplit('_', 1)
+                    target = self.dates if column == 'dates' else self.mids
+                    target[code] = data[key]
+        except (OSError, ValueError) as e:
+            print(f"Error loading {self.data_file}: {e}")
+            self.dates, self.mids, self.checked = {}, {}, None
+
+    def save(self):
+        """Save all currencies atomically"""
+        tmp_file = self.data_file + '.tmp.npz'
+        arrays = {}
+        for code in self.dates:
+            arrays[f"{code}_dates"] = self.dates[code]
+            arrays[f"{code}_mid"] = self.mids[code]
+        if self.checked:
+            arrays['checked'] = np.array(self.checked, dtype='datetime64[D]')
+        np.savez(tmp_file, **arrays)
+        os.replace(tmp_file, self.data_file)
+
+    def _merge(self, tables: List[Dict]):
+        """Fold downloaded tables into the per-currency arrays"""
+        new_dates, new_mids = {}, {}
+        for table in tables:
+            day = np.datetime64(table['effectiveDate'], 'D')
+            for rate in table.get('rates', []):
+                new_dates.setdefault(rate['code'], []).append(day)
+                new_mids.setdefault(rate['code'], []).append(rate['mid'])
+
+        for code, days in new_dates.items():
+            dates = np.concatenate([self.dates.get(code, np.empty(0, dtype='datetime64[D]')),
+                                    np.array(days, dtype='datetime64[D]')])
+            mids = np.concatenate([self.mids.get(code, np.empty(0)), np.array(new_mids[code], dtype=np.float64)])
+            # Sort and drop duplicated days, the newest download wins
+            dates, mids = dates[::-1], mids[::-1]
+            dates, first = np.unique(dates, return_index=True)
+            self.dates[code], self.mids[code] = dates, mids[first]
+
+    def coverage(self):
+        """(first, last) stored publication date, None if empty"""
+        if not self.dates:
+            return None
+        return (min(d[0] for d in self.dates.values() if len(d)),
+                max(d[-1] for d in self.dates.values() if len(d)))
+
+    def known_range(self) -> Optional[Tuple[date, date]]:
+        """(first, last) day whose table is stored or known not to exist"""
+        ranges = [r for r in (self.checked, self.coverage()) if r is not None]
+        if not ranges:
+            return None
+        ranges = [tuple(np.datetime64(d, 'D').astype(object) for d in r) for r in ranges]
+        return min(r[0] for r in ranges), max(r[1] for r in ranges)
+
+    def ensure(self, start: date, end: Optional[date] = None) -> int:
+        """Download the tables missing from [start, end]; returns tables fetched"""
+        today = date.today()
+        end = min(end or today, today)
+        # No table is published on weekends, resolve to the previous Friday
+        while end.weekday() >= 5:
+            end -= timedelta(days=1)
+
+        known = self.known_range()
+        if known is None:
+            ranges = [(start, end)]
+        else:
+            first, last = known
+            ranges = [(start, first - timedelta(days=1)), (last + timedelta(days=1), end)]
+
+        fetched = 0
+        checked = self.checked
+        for range_start, range_end in ranges:
+            if range_start > range_end:
+                continue
+            try:
+                tables = self.fetch(range_start, range_end)
+            except Exception as e:
+                print(f"Error fetching NBP tables {range_start} - {range_end}: {e}")
+                continue
+            self._merge(tables)
+            fetched += len(tables)
+            # Today's table may still be published later in the day
+            range_end = min(range_end, today - timedelta(days=1))
+            if range_start > range_end:
+                continue
+            if checked is None:
+                checked = (range_start, range_end)
+            else:
+                checked = (min(checked[0], range_start), max(checked[1], range_end))
+        if fetched or checked != self.checked:
+            self.checked = checked
+            self.save()
+        return fetched
+
+    def lookup(self, code: str, days, previous_business_day: bool = True) -> np.ndarray:
+        """Mid rates for many dates at once (one binary search).
+
+        With previous_business_day=True each date gets the table published
+        strictly before it - the rate Polish tax rules require for a trade.
+        Otherwise the latest table on or before the date is used. NaN where
+        no table is known.
+        """
+        code = code.upper()
+        days = np.asarray(days, dtype='datetime64[D]')
+        if code == 'PLN':
+            return np.ones(days.shape)
+        dates = self.dates.get(code)
+        if dates is None or not len(dates):
+            return np.full(days.shape, np.nan)
+        side = 'left' if previous_business_day else 'right'
+        index = np.searchsorted(dates, days, side=side) - 1
+        return np.where(index >= 0, self.mids[code][np.maximum(index, 0)], np.nan)
+
+    def rate(self, code: str, day, previous_business_day: bool = True) -> Optional[float]:
+        """Mid rate for a single date (None if unknown)"""
+        value = float(self.lookup(code, [day], previous_business_day)[0])
+        return None if np.isnan(value) else value
+
+
+_store = None
+
+
+def get_nbp_rates() -> NBPRates:
+    """Shared store instance"""
+    global _store
+    if _store is None:
+        _store = NBPRates()
+    return _store
@@ -2,17 +2,16 @@
 Cryptocurrencies page - Binance and Bybit
 """
 import streamlit as st
-import pandas as pd
 import time
 
 # Try to import modules with error handling
 try:
-    from portfolio_tracker import PortfolioTracker
     from config import Config
     from utils import get_usd_to_pln_rate, get_top_assets
     from purchase_prices import PurchasePriceTracker
-    from transaction_history import TransactionHistory
-    from ui_common import load_custom_css, render_sidebar
+    from ui_common import load_custom_css, render_sidebar, get_portfolios, refresh_portfolios, pnl_status
+    from ui_common import get_transaction_history
+    from ui_common import render_transactions_export, live_fragment, get_live_snapshot
     IMPORTS_SUCCESSFUL = True
 except ImportError as e:
     st.error(f"❌ Błąd importu modułów: {e}")
@@ -55,25 +54,21 @@ if not IMPORTS_SUCCESSFUL:
     st.stop()
 
 try:
-    @st.cache_data(ttl=300)  # Cache for 5 minutes
-    def get_portfolio_data():
-        tracker = PortfolioTracker()
-        data = tracker.get_all_portfolios()
-        
-        return data
-    
-    @st.cache_data(ttl=3600)
     def get_exchange_rate():
+        # The FX provider caches the rate table process-wide
         return get_usd_to_pln_rate()
     
-    # Use session state to avoid reloading portfolio on navigation
-    if 'portfolios' not in st.session_state:
-        with st.spinner("⏳ Ładowanie danych portfolio..."):
-            st.session_state.portfolios = get_portfolio_data()
+    def get_crypto_portfolios(portfolios):
+        # Filter crypto portfolios only
+        return [p for p in portfolios if p['exchange'] in ['Binance', 'Bybit']]
+    
+    # Loaded here rather than at the top so the page header is drawn first
+    import pandas as pd
     
-    portfolios = st.session_state.portfolios
+    # Last known snapshot at once, reloaded in the background when expired
+    portfolios = get_portfolios()
     usd_to_pln = get_exchange_rate()
-    transaction_history = TransactionHistory()
+    transaction_history = get_transaction_history()
     
     if not portfolios:
         st.warning("Brak danych portfolio.")
@@ -95,8 +90,7 @@ try:
                             st.success("✅ Synchronizacja zakończona!")
                             # Force refresh portfolio data
                             st.cache_data.clear()
-                            if 'portfolios' in st.session_state:
-                                del st.session_state.portfolios
+                            refresh_portfolios()
                         else:
                             st.warning("⚠️ Synchronizacja nie powiodła się - sprawdź logi w konsoli")
                     st.rerun()
@@ -107,8 +101,7 @@ try:
         with col_sync2:
             if st.button("Odśwież dane", type="secondary", use_container_width=True):
                 st.cache_data.clear()
-                if 'portfolios' in st.session_state:
-                    del st.session_state.portfolios
+                refresh_portfolios()
                 st.success("Cache wyczyszczony - dane zostaną ponownie załadowane z API")
                 st.rerun()
         
@@ -145,47 +138,55 @@ try:
                 st.success(f"Dodano transakcję: {tx_type} {amount_t} {asset_t.upper()} po ${price_t}")
                 st.rerun()
     else:
-        # Filter crypto portfolios only
-        crypto_portfolios = [p for p in portfolios if p['exchange'] in ['Binance', 'Bybit']]
+        crypto_portfolios = get_crypto_portfolios(portfolios)
         
         if not crypto_portfolios:
             st.info("Brak kryptowalut w portfolio.")
         else:
-            # Calculate crypto totals
-            crypto_value_usd = sum(p['total_value_usdt'] for p in crypto_portfolios)
-            crypto_value_pln = crypto_value_usd * usd_to_pln
-            
-            # Metrics
-            st.markdown("## Podsumowanie")
-            
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                value_display = crypto_value_usd if currency == 'USD' else crypto_value_pln
-                alt_value = crypto_value_pln if currency == 'USD' else crypto_value_usd
-                alt_symbol = 'zł' if currency == 'USD' else '$'
-                st.metric(
-                    "Wartość krypto",
-                    f"{value_display:,.2f} {currency}",
-                    f"{alt_symbol}{alt_value:,.2f}"
-                )
-            
-            with col2:
-                top_assets = get_top_assets(crypto_portfolios, top_n=100)
-                total_assets = len([a for a in top_assets if a['value_usdt'] > 1.0])
-                st.metric("Aktywa", total_assets)
-            
-            with col3:
-                active_exchanges = len([p for p in crypto_portfolios if p['total_value_usdt'] > 0])
-                st.metric("Aktywne giełdy", active_exchanges)
+            @live_fragment
+            def render_summary():
+                # Re-drawn on the auto-refresh timer, re-priced from the quote cache
+                crypto_portfolios = get_crypto_portfolios(get_live_snapshot()[1])
+                usd_to_pln = get_exchange_rate()
+                transaction_history = get_transaction_history()
+                
+                # Calculate crypto totals
+                crypto_value_usd = sum(p['total_value_usdt'] for p in crypto_portfolios)
+                crypto_value_pln = crypto_value_usd * usd_to_pln
+                
+                # Metrics
+                st.markdown("## Podsumowanie")
+                
+                col1, col2, col3, col4 = st.columns(4)
+                
+                with col1:
+                    value_display = crypto_value_usd if currency == 'USD' else crypto_value_pln
+                    alt_value = crypto_value_pln if currency == 'USD' else crypto_value_usd
+                    alt_symbol = 'zł' if currency == 'USD' else '$'
+                    st.metric(
+                        "Wartość krypto",
+                        f"{value_display:,.2f} {currency}",
+                        f"{alt_symbol}{alt_value:,.2f}"
+                    )
+                
+                with col2:
+                    top_assets = get_top_assets(crypto_portfolios, top_n=100)
+                    total_assets = len([a for a in top_assets if a['value_usdt'] > 1.0])
+                    st.metric("Aktywa", total_assets)
+                
+                with col3:
+                    active_exchanges = len([p for p in crypto_portfolios if p['total_value_usdt'] > 0])
+                    st.metric("Aktywne giełdy", active_exchanges)
+                
+                with col4:
+                    # Calculate PNL for crypto
+                    crypto_pnl = transaction_history.get_all_pnl(crypto_portfolios)
+                    total_pnl = sum(p['pnl'] for p in crypto_pnl)
+                    pnl_display = total_pnl if currency == 'USD' else total_pnl * usd_to_pln
+                    pnl_color = "+" if total_pnl >= 0 else ""
+                    st.metric("PNL krypto", f"{pnl_color}{pnl_display:,.2f} {currency}")
             
-            with col4:
-                # Calculate PNL for crypto
-                crypto_pnl = transaction_history.get_all_pnl(crypto_portfolios)
-                total_pnl = sum(p['pnl'] for p in crypto_pnl)
-                pnl_display = total_pnl if currency == 'USD' else total_pnl * usd_to_pln
-                pnl_color = "+" if total_pnl >= 0 else ""
-                st.metric("PNL krypto", f"{pnl_color}{pnl_display:,.2f} {currency}")
+            render_summary()
             
             st.markdown("---")
             
@@ -198,124 +199,137 @@ try:
             price_tracker = PurchasePriceTracker()
             
             if crypto_assets:
-                # Prepare data with PNL
-                assets_data = []
-                for asset in crypto_assets:
-                    current_price = asset['value_usdt'] / asset['total'] if asset['total'] > 0 else 0
+                @live_fragment
+                def render_assets():
+                    top_assets = get_top_assets(get_crypto_portfolios(get_live_snapshot()[1]), top_n=100)
+                    crypto_assets = [a for a in top_assets if a['value_usdt'] > 1.0]
+                    usd_to_pln = get_exchange_rate()
+                    transaction_history = get_transaction_history()
+                    price_tracker = PurchasePriceTracker()
                     
-                    # Get PNL from transaction history
-                    pnl_data = transaction_history.calculate_pnl(
-                        asset['exchange'], 
-                        asset['asset'], 
-                        current_price, 
-                        asset['total']
-                    )
+                    # Prepare data with PNL
+                    assets_data = []
+                    for asset in crypto_assets:
+                        current_price = asset['value_usdt'] / asset['total'] if asset['total'] > 0 else 0
+                        
+                        # Get PNL from transaction history
+                        pnl_data = transaction_history.calculate_pnl(
+                            asset['exchange'], 
+                            asset['asset'], 
+                            current_price, 
+                            asset['total']
+                        )
+                        
+                        # Numbers stay numbers - formatting is done by the column config
+                        asset_dict = {
+                            'Giełda': asset['exchange'],
+                            'Aktywo': asset['asset'],
+                            'Wartość USD': asset['value_usdt'],
+                            'Wartość PLN': asset['value_usdt'] * usd_to_pln,
+                            'Ilość': asset['total'],
+                            'Zainwestowano': None,
+                            'PNL całkowity': None,
+                            'PNL %': None
+                        }
+                        
+                        if pnl_data:
+                            asset_dict['Zainwestowano'] = pnl_data['invested']
+                            asset_dict['PNL całkowity'] = pnl_data['pnl']
+                            asset_dict['PNL %'] = pnl_data['pnl_percent']
+                        else:
+                            purchase_price = price_tracker.get_purchase_price(asset['exchange'], asset['asset'])
+                            if purchase_price:
+                                pnl_percent = ((current_price - purchase_price) / purchase_price * 100) if purchase_price > 0 else 0
+                                asset_dict['Zainwestowano'] = asset['total'] * purchase_price
+                                asset_dict['PNL całkowity'] = asset['value_usdt'] - (asset['total'] * purchase_price)
+                                asset_dict['PNL %'] = pnl_percent
+                        
+                        assets_data.append(asset_dict)
+                    
+                    df_assets = pd.DataFrame(assets_data).astype({
+                        'Wartość USD': 'float64', 'Wartość PLN': 'float64', 'Ilość': 'float64',
+                        'Zainwestowano': 'float64', 'PNL całkowity': 'float64', 'PNL %': 'float64'
+                    })
+                    df_assets['Status'] = pnl_status(df_assets['PNL całkowity'])
+                    
+                    # View mode toggle
+                    view_mode = st.radio("**Wyświetl jako:**", ["Tabela", "Karty"], horizontal=True, key="crypto_view_mode")
+                    
+                    # Filters
+                    st.markdown("### Filtry i Sortowanie")
+                    col_f1, col_f2, col_f3 = st.columns(3)
+                    
+                    with col_f1:
+                        filter_exchange = st.multiselect(
+                            "Giełda",
+                            options=["Binance", "Bybit"],
+                            default=["Binance", "Bybit"]
+                        )
+                    
+                    with col_f2:
+                        filter_pnl = st.selectbox(
+                            "PNL",
+                            options=["Wszystkie", "Na plusie", "Na minusie", "Brak danych"]
+                        )
+                    
+                    with col_f3:
+                        sort_by = st.selectbox(
+                            "Sortuj według",
+                            options=["Wartość USD", "PNL %", "PNL całkowity", "Aktywo"]
+                        )
+                    
+                    # Apply filters
+                    df_filtered = df_assets.copy()
                     
-                    asset_dict = {
-                        'Giełda': asset['exchange'],
-                        'Aktywo': asset['asset'],
-                        'Wartość USD': f"${asset['value_usdt']:,.2f}",
-                        'Wartość PLN': f"{asset['value_usdt'] * usd_to_pln:,.2f} zł",
-                        'Ilość': f"{asset['total']:.8f}"
-                    }
+                    if filter_exchange:
+                        df_filtered = df_filtered[df_filtered['Giełda'].isin(filter_exchange)]
                     
-                    if pnl_data:
-                        asset_dict['Zainwestowano'] = f"${pnl_data['invested']:,.2f}"
-                        asset_dict['PNL całkowity'] = f"${pnl_data['pnl']:+,.2f}"
-                        asset_dict['PNL %'] = f"{pnl_data['pnl_percent']:+.2f}%"
-                        asset_dict['Status'] = 'Profit' if pnl_data['pnl'] > 0 else 'Loss' if pnl_data['pnl'] < 0 else 'Break even'
+                    if filter_pnl == "Na plusie":
+                        df_filtered = df_filtered[df_filtered['PNL całkowity'] > 0]
+                    elif filter_pnl == "Na minusie":
+                        df_filtered = df_filtered[df_filtered['PNL całkowity'] < 0]
+                    elif filter_pnl == "Brak danych":
+                        df_filtered = df_filtered[df_filtered['PNL całkowity'].isna()]
+                    
+                    # Sort (numeric columns descending, missing PNL last)
+                    df_filtered = df_filtered.sort_values(sort_by, ascending=sort_by == "Aktywo", na_position='last')
+                    
+                    # Display based on view mode
+                    if view_mode == "Karty":
+                        from ui_common import render_asset_cards
+                        render_asset_cards(df_filtered, currency, usd_to_pln)
                     else:
-                        purchase_price = price_tracker.get_purchase_price(asset['exchange'], asset['asset'])
-                        if purchase_price:
-                            pnl_percent = ((current_price - purchase_price) / purchase_price * 100) if purchase_price > 0 else 0
-                            pnl = asset['value_usdt'] - (asset['total'] * purchase_price)
-                            asset_dict['Zainwestowano'] = f"${asset['total'] * purchase_price:,.2f}"
-                            asset_dict['PNL całkowity'] = f"${pnl:+,.2f}"
-                            asset_dict['PNL %'] = f"{pnl_percent:+.2f}%"
-                            asset_dict['Status'] = 'Profit' if pnl > 0 else 'Loss' if pnl < 0 else 'Break even'
-                        else:
-                            asset_dict['Zainwestowano'] = "Brak"
-                            asset_dict['PNL całkowity'] = "-"
-                            asset_dict['PNL %'] = "-"
-                            asset_dict['Status'] = 'No data'
+                        st.dataframe(
+                            df_filtered,
+                            hide_index=True,
+                            use_container_width=True,
+                            column_config={
+                                'Wartość USD': st.column_config.NumberColumn(format="$%.2f"),
+                                'Wartość PLN': st.column_config.NumberColumn(format="%.2f zł"),
+                                'Ilość': st.column_config.NumberColumn(format="%.8f"),
+                                'Zainwestowano': st.column_config.NumberColumn(format="$%.2f"),
+                                'PNL całkowity': st.column_config.NumberColumn(format="$%+.2f"),
+                                'PNL %': st.column_config.NumberColumn(format="%+.2f%%")
+                            }
+                        )
                     
-                    assets_data.append(asset_dict)
-                
-                df_assets = pd.DataFrame(assets_data)
-                
-                # View mode toggle
-                view_mode = st.radio("**Wyświetl jako:**", ["Tabela", "Karty"], horizontal=True, key="crypto_view_mode")
-                
-                # Filters
-                st.markdown("### Filtry i Sortowanie")
-                col_f1, col_f2, col_f3 = st.columns(3)
-                
-                with col_f1:
-                    filter_exchange = st.multiselect(
-                        "Giełda",
-                        options=["Binance", "Bybit"],
-                        default=["Binance", "Bybit"]
-                    )
-                
-                with col_f2:
-                    filter_pnl = st.selectbox(
-                        "PNL",
-                        options=["Wszystkie", "Na plusie", "Na minusie", "Brak danych"]
-                    )
-                
-                with col_f3:
-                    sort_by = st.selectbox(
-                        "Sortuj według",
-                        options=["Wartość USD", "PNL %", "PNL całkowity", "Aktywo"]
+                    # Export
+                    csv = df_filtered.to_csv(index=False)
+                    st.download_button(
+                        label="Eksportuj do CSV",
+                        data=csv,
+                        file_name=f"crypto_assets_{time.strftime('%Y%m%d')}.csv",
+                        mime="text/csv",
+                        use_container_width=True
                     )
+                    
+                    # Performance section
+                    st.markdown("---")
+                    st.markdown("## Top Performers")
+                    from ui_common import render_performance_section
+                    render_performance_section("Best/Worst Crypto", df_filtered)
                 
-                # Apply filters
-                df_filtered = df_assets.copy()
-                
-                if filter_exchange:
-                    df_filtered = df_filtered[df_filtered['Giełda'].isin(filter_exchange)]
-                
-                if filter_pnl == "Na plusie":
-                    df_filtered = df_filtered[df_filtered['Status'] == 'Profit']
-                elif filter_pnl == "Na minusie":
-                    df_filtered = df_filtered[df_filtered['Status'] == 'Loss']
-                elif filter_pnl == "Brak danych":
-                    df_filtered = df_filtered[df_filtered['Status'] == 'No data']
-                
-                # Sort
-                if sort_by == "PNL %":
-                    df_filtered['PNL_num'] = df_filtered['PNL %'].str.replace('%', '').str.replace('+', '').replace('-', '').astype(float, errors='ignore')
-                    df_filtered = df_filtered.sort_values('PNL_num', ascending=False, na_position='last')
-                    df_filtered = df_filtered.drop('PNL_num', axis=1)
-                elif sort_by == "Wartość USD":
-                    df_filtered['Wartość_num'] = df_filtered['Wartość USD'].str.replace('$', '').str.replace(',', '').astype(float, errors='ignore')
-                    df_filtered = df_filtered.sort_values('Wartość_num', ascending=False, na_position='last')
-                    df_filtered = df_filtered.drop('Wartość_num', axis=1)
-                elif sort_by == "Aktywo":
-                    df_filtered = df_filtered.sort_values('Aktywo')
-                
-                # Display based on view mode
-                if view_mode == "Karty":
-                    from ui_common import render_asset_cards
-                    render_asset_cards(df_filtered, currency, usd_to_pln)
-                else:
-                    st.dataframe(df_filtered, hide_index=True, use_container_width=True)
-                
-                # Export
-                csv = df_filtered.to_csv(index=False)
-                st.download_button(
-                    label="Eksportuj do CSV",
-                    data=csv,
-                    file_name=f"crypto_assets_{time.strftime('%Y%m%d')}.csv",
-                    mime="text/csv",
-                    use_container_width=True
-                )
-                
-                # Performance section
-                st.markdown("---")
-                st.markdown("## Top Performers")
-                from ui_common import render_performance_section
-                render_performance_section("Best/Worst Crypto", df_filtered)
+                render_assets()
                 
                 # Purchase price management
                 st.markdown("---")
@@ -360,8 +374,7 @@ try:
                                 st.success("✅ Synchronizacja zakończona!")
                                 # Force refresh portfolio data
                                 st.cache_data.clear()
-                                if 'portfolios' in st.session_state:
-                                    del st.session_state.portfolios
+                                refresh_portfolios()
                             else:
                                 st.warning("⚠️ Synchronizacja nie powiodła się - sprawdź logi w konsoli")
                         st.rerun()
@@ -416,15 +429,13 @@ try:
                     if len(crypto_transactions) > 10:
                         st.info(f"... i {len(crypto_transactions) - 10} więcej")
                     
-                    # Export
-                    df_tx = pd.DataFrame(crypto_transactions)
-                    csv_tx = df_tx.to_csv(index=False)
-                    st.download_button(
-                        label="Eksportuj historię",
-                        data=csv_tx,
-                        file_name=f"crypto_transactions_{time.strftime('%Y%m%d')}.csv",
-                        mime="text/csv",
-                        use_container_width=True
+                    # Export - built on request, cached per version of the transaction file
+                    render_transactions_export(
+                        "Eksportuj historię",
+                        f"crypto_transactions_{time.strftime('%Y%m%d')}.csv",
+                        "crypto_transactions",
+                        transaction_history.version,
+                        lambda: crypto_transactions
                     )
                 else:
                     st.info("Brak transakcji. Dodaj pierwszą powyżej.")
@@ -469,4 +480,3 @@ try:
 except Exception as e:
     st.error(f"Błąd: {e}")
     st.exception(e)
-
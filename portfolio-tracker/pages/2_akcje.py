@@ -2,18 +2,18 @@
 Stocks page for traditional assets
 """
 import streamlit as st
-import pandas as pd
 import time
 
 # Try to import modules with error handling
 try:
-    from portfolio_tracker import PortfolioTracker
     # config import removed (not used in this module)
     from utils import get_usd_to_pln_rate
-    from transaction_history import TransactionHistory
-    from stock_prices import get_multiple_stock_prices
-    from stock_validator import validate_stock_symbol, get_popular_stocks, search_by_isin
-    from ui_common import load_custom_css, render_sidebar
+    from quote_cache import get_cached_stock_prices, quote_cache
+    from stock_prices import get_spark_history
+    from stock_validator import validate_stock_symbol, validate_many, get_popular_stocks, search_by_isin, search_stocks
+    from ui_common import load_custom_css, render_sidebar, get_portfolios, refresh_portfolios, pnl_status
+    from ui_common import get_transaction_history
+    from ui_common import render_transactions_export, live_fragment
     IMPORTS_SUCCESSFUL = True
 except ImportError as e:
     st.error(f"❌ Błąd importu modułów: {e}")
@@ -42,23 +42,23 @@ if not IMPORTS_SUCCESSFUL:
     st.stop()
 
 try:
-    @st.cache_data(ttl=300)  # Cache for 5 minutes
-    def get_portfolio_data():
-        tracker = PortfolioTracker()
-        return tracker.get_all_portfolios()
-    
-    @st.cache_data(ttl=3600)
     def get_exchange_rate():
+        # The FX provider caches the rate table process-wide
         return get_usd_to_pln_rate()
     
-    # Use session state to avoid reloading portfolio on navigation
-    if 'portfolios' not in st.session_state:
-        with st.spinner("⏳ Ładowanie danych portfolio..."):
-            st.session_state.portfolios = get_portfolio_data()
+    @st.cache_data(ttl=3600)
+    def get_sparklines(symbols):
+        # One spark request per 20 symbols instead of a chart call per holding
+        history = get_spark_history(list(symbols), period='3mo')
+        return {symbol: closes.tolist() for symbol, (_, closes) in history.items()}
+    
+    # Loaded here rather than at the top so the page header is drawn first
+    import pandas as pd
     
-    portfolios = st.session_state.portfolios
+    # Last known snapshot at once, reloaded in the background when expired
+    portfolios = get_portfolios()
     usd_to_pln = get_exchange_rate()
-    transaction_history = TransactionHistory()
+    transaction_history = get_transaction_history()
     
     # Get transactions (no XTB, just manual entries)
     transactions = [t for t in transaction_history.transactions if t['exchange'] == 'Manual']
@@ -96,13 +96,13 @@ try:
                     search_query = st.text_input("Wyszukaj:", key="stock_search_extended")
                     
                     if search_query:
-                        filtered = {k: v for k, v in popular_stocks.items() 
-                                  if search_query.upper() in k.upper() or search_query.upper() in v.upper()}
+                        # Type-ahead over the instrument list (symbol and name prefixes) plus popular symbols
+                        filtered = search_stocks(search_query.strip())
                         
                         if filtered:
                             st.markdown(f"**Znaleziono {len(filtered)} wyników:**")
                             cols2 = st.columns(3)
-                            for idx, (symbol, name) in enumerate(filtered.items()):
+                            for idx, (symbol, name) in enumerate(filtered):
                                 with cols2[idx % 3]:
                                     st.markdown(f"**{symbol}** - {name}")
                         else:
@@ -237,6 +237,45 @@ try:
                 
                 time.sleep(1)  # Brief delay to show success message
                 st.rerun()
+        
+        # Import from CSV - all symbols are validated together before anything is saved
+        with st.expander("Importuj transakcje z CSV"):
+            st.caption("Kolumny: date, asset, amount, price, type (buy/sell)")
+            uploaded_csv = st.file_uploader("Plik CSV", type=["csv"], key="stock_import_csv")
+            
+            if uploaded_csv is not None and st.button("Importuj", use_container_width=True, key="stock_import_btn"):
+                try:
+                    df_import = pd.read_csv(uploaded_csv)
+                    df_import['asset'] = df_import['asset'].astype(str).str.strip().str.upper()
+                    # Converted up front so a bad row fails before anything is saved
+                    df_import = df_import.astype({'amount': 'float64', 'price': 'float64'})
+                    if not df_import['type'].isin(['buy', 'sell']).all():
+                        raise ValueError("kolumna 'type' może zawierać tylko buy/sell")
+                    
+                    with st.spinner(f"Sprawdzanie {df_import['asset'].nunique()} symboli..."):
+                        validation = validate_many(df_import['asset'].tolist())
+                    invalid = {symbol for symbol, (is_valid, _) in validation.items() if not is_valid}
+                    
+                    imported = 0
+                    for _, row in df_import[~df_import['asset'].isin(invalid)].iterrows():
+                        transaction_history.add_transaction(
+                            exchange="Manual",
+                            asset=row['asset'],
+                            amount=row['amount'],
+                            price_usd=row['price'],
+                            transaction_type=row['type'],
+                            date=row['date'] if 'date' in row and pd.notna(row['date']) else None
+                        )
+                        imported += 1
+                    
+                    if invalid:
+                        st.warning(f"Pominięto nieznane symbole: {', '.join(sorted(invalid))}")
+                    st.success(f"Zaimportowano {imported} transakcji")
+                    if imported:
+                        time.sleep(1)  # Brief delay to show success message
+                        st.rerun()
+                except (KeyError, ValueError) as e:
+                    st.error(f"Nieprawidłowy plik CSV: {e}")
     
     with col_t2:
         st.markdown("### Historia Transakcji")
@@ -268,14 +307,12 @@ try:
             
             # Export
             st.markdown("#### Eksport")
-            df_tx = pd.DataFrame(transactions)
-            csv_tx = df_tx.to_csv(index=False)
-            st.download_button(
-                label="Eksportuj historię",
-                data=csv_tx,
-                file_name=f"stocks_transactions_{time.strftime('%Y%m%d')}.csv",
-                mime="text/csv",
-                use_container_width=True
+            render_transactions_export(
+                "Eksportuj historię",
+                f"stocks_transactions_{time.strftime('%Y%m%d')}.csv",
+                "stock_transactions",
+                transaction_history.version,
+                lambda: transactions
             )
         else:
             st.info("Brak transakcji. Dodaj pierwszą po lewej stronie.")
@@ -309,37 +346,43 @@ try:
             # ==========================================
             st.markdown("## Podsumowanie")
             
-            # Calculate totals
-            stock_symbols = list(holdings.keys())
-            current_prices = get_multiple_stock_prices(stock_symbols)
-            
-            total_value = sum(data['amount'] * current_prices.get(asset, 0) for asset, data in holdings.items())
-            total_invested = sum(data['total_cost'] for data in holdings.values())
-            total_pnl = total_value - total_invested
-            total_pnl_percent = (total_pnl / total_invested * 100) if total_invested > 0 else 0
-            
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                value_display = total_value if currency == 'USD' else total_value * usd_to_pln
-                alt_value = total_value * usd_to_pln if currency == 'USD' else total_value
-                alt_symbol = 'zł' if currency == 'USD' else '$'
-                st.metric(
-                    "Wartość akcji",
-                    f"{value_display:,.2f} {currency}",
-                    f"{alt_symbol}{alt_value:,.2f}"
-                )
-            
-            with col2:
-                st.metric("Aktywa", len(holdings))
-            
-            with col3:
-                pnl_display = total_pnl if currency == 'USD' else total_pnl * usd_to_pln
-                pnl_color = "+" if total_pnl >= 0 else ""
-                st.metric("PNL", f"{pnl_color}{pnl_display:,.2f} {currency}")
+            @live_fragment
+            def render_summary(holdings):
+                # Re-drawn on the auto-refresh timer from the cached quotes
+                usd_to_pln = get_exchange_rate()
+                # Calculate totals
+                stock_symbols = list(holdings.keys())
+                current_prices = get_cached_stock_prices(stock_symbols)
+                
+                total_value = sum(data['amount'] * current_prices.get(asset, 0) for asset, data in holdings.items())
+                total_invested = sum(data['total_cost'] for data in holdings.values())
+                total_pnl = total_value - total_invested
+                total_pnl_percent = (total_pnl / total_invested * 100) if total_invested > 0 else 0
+                
+                col1, col2, col3, col4 = st.columns(4)
+                
+                with col1:
+                    value_display = total_value if currency == 'USD' else total_value * usd_to_pln
+                    alt_value = total_value * usd_to_pln if currency == 'USD' else total_value
+                    alt_symbol = 'zł' if currency == 'USD' else '$'
+                    st.metric(
+                        "Wartość akcji",
+                        f"{value_display:,.2f} {currency}",
+                        f"{alt_symbol}{alt_value:,.2f}"
+                    )
+                
+                with col2:
+                    st.metric("Aktywa", len(holdings))
+                
+                with col3:
+                    pnl_display = total_pnl if currency == 'USD' else total_pnl * usd_to_pln
+                    pnl_color = "+" if total_pnl >= 0 else ""
+                    st.metric("PNL", f"{pnl_color}{pnl_display:,.2f} {currency}")
+                
+                with col4:
+                    st.metric("ROI", f"{total_pnl_percent:.2f}%")
             
-            with col4:
-                st.metric("ROI", f"{total_pnl_percent:.2f}%")
+            render_summary(holdings)
             
             # Przyciski odświeżania
             st.markdown("---")
@@ -348,8 +391,8 @@ try:
             with col_refresh1:
                 if st.button("Odśwież dane", type="secondary", use_container_width=True):
                     st.cache_data.clear()
-                    if 'portfolios' in st.session_state:
-                        del st.session_state.portfolios
+                    quote_cache.invalidate()
+                    refresh_portfolios()
                     st.success("Cache wyczyszczony - dane zostaną ponownie załadowane")
                     st.rerun()
             
@@ -366,86 +409,104 @@ try:
             # ==========================================
             st.markdown("## Akcje")
             
-            # Get current prices
-            st.info(f"Pobieranie aktualnych cen dla {len(stock_symbols)} aktywów...")
-            current_prices = get_multiple_stock_prices(stock_symbols)
-            
-            # Prepare display data
-            xtb_data = []
-            for asset, data in holdings.items():
-                avg_price = data['total_cost'] / data['amount'] if data['amount'] > 0 else 0
-                current_price = current_prices.get(asset, avg_price)
+            @live_fragment
+            def render_holdings(holdings):
+                stock_symbols = list(holdings.keys())
+                
+                # Get current prices
+                st.info(f"Pobieranie aktualnych cen dla {len(stock_symbols)} aktywów...")
+                current_prices = get_cached_stock_prices(stock_symbols)
                 
-                pnl = data['amount'] * current_price - data['total_cost']
-                pnl_percent = (pnl / data['total_cost'] * 100) if data['total_cost'] > 0 else 0
+                sparklines = get_sparklines(tuple(sorted(stock_symbols)))
                 
-                xtb_data.append({
-                    'Aktywo': asset,
-                    'Ilość': f"{data['amount']:.2f}",
-                    'Średnia cena zakupu': f"${avg_price:.2f}",
-                    'Obecna cena': f"${current_price:.2f}",
-                    'Wartość': f"${data['amount'] * current_price:.2f}",
-                    'Zainwestowano': f"${data['total_cost']:.2f}",
-                    'PNL': f"${pnl:.2f}",
-                    'PNL %': f"{pnl_percent:.2f}%",
-                    'Status': 'Profit' if pnl > 0 else 'Loss' if pnl < 0 else 'Break even'
+                # Prepare display data
+                xtb_data = []
+                for asset, data in holdings.items():
+                    avg_price = data['total_cost'] / data['amount'] if data['amount'] > 0 else 0
+                    current_price = current_prices.get(asset, avg_price)
+                    
+                    pnl = data['amount'] * current_price - data['total_cost']
+                    pnl_percent = (pnl / data['total_cost'] * 100) if data['total_cost'] > 0 else 0
+                    
+                    # Numbers stay numbers - formatting is done by the column config
+                    xtb_data.append({
+                        'Aktywo': asset,
+                        'Ilość': data['amount'],
+                        'Średnia cena zakupu': avg_price,
+                        'Obecna cena': current_price,
+                        'Wartość': data['amount'] * current_price,
+                        'Zainwestowano': data['total_cost'],
+                        'PNL': pnl,
+                        'PNL %': pnl_percent,
+                        'Trend 3M': sparklines.get(asset, [])
+                    })
+                
+                df_xtb = pd.DataFrame(xtb_data).astype({
+                    'Ilość': 'float64', 'Średnia cena zakupu': 'float64', 'Obecna cena': 'float64',
+                    'Wartość': 'float64', 'Zainwestowano': 'float64', 'PNL': 'float64', 'PNL %': 'float64'
                 })
-            
-            df_xtb = pd.DataFrame(xtb_data)
-            
-            # Filters
-            st.markdown("### Filtry i Sortowanie")
-            col_f1, col_f2 = st.columns(2)
-            
-            with col_f1:
-                filter_pnl = st.selectbox(
-                    "PNL",
-                    options=["Wszystkie", "Na plusie", "Na minusie"]
+                df_xtb.insert(len(df_xtb.columns) - 1, 'Status', pnl_status(df_xtb['PNL']))
+                
+                # Filters
+                st.markdown("### Filtry i Sortowanie")
+                col_f1, col_f2 = st.columns(2)
+                
+                with col_f1:
+                    filter_pnl = st.selectbox(
+                        "PNL",
+                        options=["Wszystkie", "Na plusie", "Na minusie"]
+                    )
+                
+                with col_f2:
+                    sort_by = st.selectbox(
+                        "Sortuj według",
+                        options=["Wartość", "PNL %", "PNL", "Aktywo"]
+                    )
+                
+                # Apply filters
+                df_filtered = df_xtb.copy()
+                
+                if filter_pnl == "Na plusie":
+                    df_filtered = df_filtered[df_filtered['PNL'] > 0]
+                elif filter_pnl == "Na minusie":
+                    df_filtered = df_filtered[df_filtered['PNL'] < 0]
+                
+                # Sort (numeric columns descending)
+                df_filtered = df_filtered.sort_values(sort_by, ascending=sort_by == "Aktywo", na_position='last')
+                
+                st.dataframe(
+                    df_filtered,
+                    hide_index=True,
+                    use_container_width=True,
+                    column_config={
+                        'Ilość': st.column_config.NumberColumn(format="%.2f"),
+                        'Średnia cena zakupu': st.column_config.NumberColumn(format="$%.2f"),
+                        'Obecna cena': st.column_config.NumberColumn(format="$%.2f"),
+                        'Wartość': st.column_config.NumberColumn(format="$%.2f"),
+                        'Zainwestowano': st.column_config.NumberColumn(format="$%.2f"),
+                        'PNL': st.column_config.NumberColumn(format="$%+.2f"),
+                        'PNL %': st.column_config.NumberColumn(format="%+.2f%%"),
+                        'Trend 3M': st.column_config.LineChartColumn("Trend 3M")
+                    }
                 )
-            
-            with col_f2:
-                sort_by = st.selectbox(
-                    "Sortuj według",
-                    options=["Wartość", "PNL %", "PNL", "Aktywo"]
+                
+                # Export
+                csv_xtb = df_filtered.drop(columns=['Trend 3M']).to_csv(index=False)
+                st.download_button(
+                    label="Eksportuj akcje do CSV",
+                    data=csv_xtb,
+                    file_name=f"stocks_{time.strftime('%Y%m%d')}.csv",
+                    mime="text/csv",
+                    use_container_width=True
                 )
+                
+                # Performance section
+                st.markdown("---")
+                st.markdown("## Top Performers")
+                from ui_common import render_performance_section
+                render_performance_section("Best/Worst Stocks", df_filtered)
             
-            # Apply filters
-            df_filtered = df_xtb.copy()
-            
-            if filter_pnl == "Na plusie":
-                df_filtered = df_filtered[df_filtered['Status'] == 'Profit']
-            elif filter_pnl == "Na minusie":
-                df_filtered = df_filtered[df_filtered['Status'] == 'Loss']
-            
-            # Sort
-            if sort_by == "PNL %":
-                df_filtered['PNL_num'] = df_filtered['PNL %'].str.replace('%', '').str.replace('+', '').replace('-', '').astype(float, errors='ignore')
-                df_filtered = df_filtered.sort_values('PNL_num', ascending=False, na_position='last')
-                df_filtered = df_filtered.drop('PNL_num', axis=1)
-            elif sort_by == "Wartość":
-                df_filtered['Wartość_num'] = df_filtered['Wartość'].str.replace('$', '').str.replace(',', '').astype(float, errors='ignore')
-                df_filtered = df_filtered.sort_values('Wartość_num', ascending=False, na_position='last')
-                df_filtered = df_filtered.drop('Wartość_num', axis=1)
-            elif sort_by == "Aktywo":
-                df_filtered = df_filtered.sort_values('Aktywo')
-            
-            st.dataframe(df_filtered, hide_index=True, use_container_width=True)
-            
-            # Export
-            csv_xtb = df_filtered.to_csv(index=False)
-            st.download_button(
-                label="Eksportuj akcje do CSV",
-                data=csv_xtb,
-                file_name=f"stocks_{time.strftime('%Y%m%d')}.csv",
-                mime="text/csv",
-                use_container_width=True
-            )
-            
-            # Performance section
-            st.markdown("---")
-            st.markdown("## Top Performers")
-            from ui_common import render_performance_section
-            render_performance_section("Best/Worst Stocks", df_filtered)
+            render_holdings(holdings)
             
             st.markdown("---")
 
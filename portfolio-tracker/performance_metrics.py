@@ -0,0 +1,237 @@
+"""
+Incremental performance metrics (volatility, drawdown, Sharpe, Sortino)
+"""
+import json
+import math
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+
+SECONDS_PER_YEAR = 365.25 * 24 * 60 * 60
+
+# Prefix-sum columns kept next to every history tier
+PREFIX_COLUMNS = ('ret_sum', 'ret_sq_sum', 'down_sq_sum')
+
+# Window name -> length in seconds (None = special handling)
+WINDOWS = {
+    '1D': 24 * 60 * 60,
+    '7D': 7 * 24 * 60 * 60,
+    '30D': 30 * 24 * 60 * 60,
+    'YTD': None,
+    'ALL': None,
+}
+
+
+def period_returns(values, previous=None):
+    """Simple returns between consecutive values (0 where the base is not positive)"""
+    values = np.asarray(values, dtype=np.float64)
+    if previous is None:
+        previous, values = values[:-1], values[1:]
+    previous = np.asarray(previous, dtype=np.float64)
+    safe = np.where(previous > 0, previous, 1.0)
+    return np.where(previous > 0, values / safe - 1.0, 0.0)
+
+
+def prefix_sums(values, start_row=None, base=None):
+    """Cumulative sums of returns, squared returns and squared downside returns.
+
+    Row i holds the sums over returns 1..i, so any window (a, b] is answered
+    as prefix[b] - prefix[a]. With start_row/base only rows from start_row
+    onwards are computed, continuing from the prefix values of row
+    start_row - 1.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if start_row is None or start_row <= 0:
+        returns = np.r_[0.0, period_returns(values)] if len(values) else np.empty(0)
+        base = (0.0, 0.0, 0.0)
+    else:
+        returns = period_returns(values[start_row:], values[start_row - 1:-1])
+    downside = np.minimum(returns, 0.0)
+    return {
+        'ret_sum': base[0] + np.cumsum(returns),
+        'ret_sq_sum': base[1] + np.cumsum(returns * returns),
+        'down_sq_sum': base[2] + np.cumsum(downside * downside),
+    }
+
+
+class RunningStats:
+    """All-time statistics updated in O(1) per appended value.
+
+    Uses Welford's algorithm for the variance of period returns and keeps
+    the running peak, max drawdown and downside deviation.
+    """
+
+    def __init__(self):
+        self.count = 0          # number of returns
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.down_sq_sum = 0.0
+        self.last_value = None
+        self.peak = 0.0
+        self.max_drawdown = 0.0  # fraction, <= 0
+
+    def update(self, value: float):
+        """Fold one new portfolio value into the statistics"""
+        if self.last_value is not None and self.last_value > 0:
+            ret = value / self.last_value - 1.0
+            self.count += 1
+            delta = ret - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (ret - self.mean)
+            if ret < 0:
+                self.down_sq_sum += ret * ret
+        self.last_value = value
+
+        self.peak = max(self.peak, value)
+        if self.peak > 0:
+            self.max_drawdown = min(self.max_drawdown, value / self.peak - 1.0)
+
+    @classmethod
+    def from_values(cls, values):
+        """Build the statistics for a whole series at once (vectorized)"""
+        stats = cls()
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return stats
+        returns = period_returns(values)
+        returns = returns[values[:-1] > 0]
+        stats.count = len(returns)
+        if stats.count:
+            stats.mean = float(returns.mean())
+            stats.m2 = float(((returns - stats.mean) ** 2).sum())
+            stats.down_sq_sum = float((np.minimum(returns, 0.0) ** 2).sum())
+        peaks = np.maximum.accumulate(values)
+        stats.peak = float(peaks[-1])
+        positive = peaks > 0
+        if positive.any():
+            stats.max_drawdown = float(min(0.0, (values[positive] / peaks[positive] - 1.0).min()))
+        stats.last_value = float(values[-1])
+        return stats
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    @property
+    def downside_deviation(self):
+        return math.sqrt(self.down_sq_sum / self.count) if self.count else 0.0
+
+    @property
+    def current_drawdown(self):
+        if not self.peak or self.last_value is None:
+            return 0.0
+        return self.last_value / self.peak - 1.0
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        for key, value in data.items():
+            if key in stats.__dict__:
+                setattr(stats, key, value)
+        return stats
+
+    def save(self, path):
+        """Save statistics atomically"""
+        tmp_file = path + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_file, path)
+
+    @classmethod
+    def load(cls, path):
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    return cls.from_dict(json.load(f))
+            except:
+                print(f"Error loading {path}, metrics will be rebuilt")
+        return None
+
+
+class PerformanceMetrics:
+    """Windowed metrics answered from the history's prefix-sum columns.
+
+    A window costs two binary searches plus O(1) arithmetic; nothing is
+    recomputed from the individual snapshots except the window drawdown.
+    """
+
+    def __init__(self, history, risk_free_rate: float = 0.0):
+        self.history = history
+        self.risk_free_rate = risk_free_rate
+
+    def _window_start(self, name, now):
+        if name == 'ALL':
+            return None
+        if name == 'YTD':
+            return int(datetime(datetime.fromtimestamp(now).year, 1, 1).timestamp())
+        return now - WINDOWS[name]
+
+    def window(self, name: str, now: Optional[int] = None) -> Optional[Dict]:
+        """Metrics for '1D', '7D', '30D', 'YTD' or 'ALL' (None if not enough data)"""
+        now = int(datetime.now().timestamp()) if now is None else now
+        start = self._window_start(name, now)
+
+        tier = self.history.select_tier(start)
+        table = self.history.tiers[tier]
+        timestamps = table.column('timestamp')
+        if len(timestamps) < 2:
+            return None
+
+        last = len(timestamps) - 1
+        # Base is the last point at or before the window start, so the change
+        # really spans the whole window
+        if start is None:
+            base = 0
+        else:
+            base = max(int(np.searchsorted(timestamps, start, side='right')) - 1, 0)
+        if base >= last:
+            return None
+
+        values = table.column('value_usd')
+        count = last - base
+        ret_sum = table.column('ret_sum')[last] - table.column('ret_sum')[base]
+        ret_sq_sum = table.column('ret_sq_sum')[last] - table.column('ret_sq_sum')[base]
+        down_sq_sum = table.column('down_sq_sum')[last] - table.column('down_sq_sum')[base]
+
+        mean = ret_sum / count
+        variance = max(ret_sq_sum - count * mean * mean, 0.0) / (count - 1) if count > 1 else 0.0
+        std = math.sqrt(variance)
+        downside = math.sqrt(down_sq_sum / count)
+
+        span = int(timestamps[last] - timestamps[base])
+        periods_per_year = count / (span / SECONDS_PER_YEAR) if span > 0 else 0.0
+        annualize = math.sqrt(periods_per_year)
+        excess = mean - self.risk_free_rate / periods_per_year if periods_per_year else mean
+
+        window_values = values[base:last + 1]
+        peaks = np.maximum.accumulate(window_values)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            drawdowns = np.where(peaks > 0, window_values / peaks - 1.0, 0.0)
+
+        start_value = float(values[base])
+        end_value = float(values[last])
+        change = end_value - start_value
+        return {
+            'window': name,
+            'tier': tier,
+            'start_timestamp': int(timestamps[base]),
+            'end_timestamp': int(timestamps[last]),
+            'start_value': start_value,
+            'end_value': end_value,
+            'change': change,
+            'change_pct': (change / start_value * 100) if start_value > 0 else 0.0,
+            'volatility_pct': std * annualize * 100,
+            'downside_deviation_pct': downside * annualize * 100,
+            'sharpe_ratio': float(excess / std * annualize) if std > 0 else 0.0,
+            'sortino_ratio': float(excess / downside * annualize) if downside > 0 else 0.0,
+            'max_drawdown_pct': float(drawdowns.min()) * 100,
+        }
+
+    def summary(self, now: Optional[int] = None) -> Dict[str, Optional[Dict]]:
+        """All standard windows at once"""
+        return {name: self.window(name, now) for name in WINDOWS}
@@ -0,0 +1,189 @@
+"""
+Stale-while-revalidate access to portfolio data for the dashboard
+"""
+import os
+import threading
+import time
+from types import MappingProxyType
+from typing import Callable, Hashable, Optional
+
+
+def freeze(value):
+    """Read-only copy of loaded JSON-like data (dicts become mappings, lists tuples)"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class StaleWhileRevalidate:
+    """Holds the last loaded snapshot and refreshes it in the background.
+
+    get() answers immediately with whatever snapshot is held; once it is
+    older than `ttl` seconds a daemon thread reloads it and the new
+    snapshot is returned by the next get() (the next Streamlit rerun).
+    Only the very first load blocks the caller; if it fails, get() returns
+    an empty snapshot and the next call tries again. A failed reload keeps
+    the old snapshot and is retried after `retry_after` seconds.
+
+    Snapshots are frozen, so one instance can be shared by every session.
+    """
+
+    def __init__(self, loader: Callable, ttl: int = 300, retry_after: int = 30):
+        self.loader = loader
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._data = None
+        self.fetched_at: Optional[float] = None  # epoch seconds of the current snapshot
+        self.version = 0  # bumped on every successful load
+        self._failed_at = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self.error: Optional[str] = None
+
+    def _load(self):
+        try:
+            data = self.loader()
+        except Exception as e:
+            print(f"Error refreshing portfolio data: {e}")
+            with self._lock:
+                self.error = str(e)
+                self._failed_at = time.time()
+            return
+        data = freeze(data)
+        with self._lock:
+            self._data = data
+            self.fetched_at = time.time()
+            self.version += 1
+            self.error = None
+
+    def _start_refresh(self):
+        """Start a background reload unless one is already running (lock held)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._load, name='portfolio-refresh', daemon=True)
+        self._thread.start()
+
+    def get(self):
+        """Current snapshot; schedules a background reload when it has expired"""
+        return self.snapshot()[1]
+
+    def snapshot(self):
+        """(version, data) of the current snapshot, read together under the lock"""
+        if self.fetched_at is None:
+            # Nothing to show yet - the first load has to be waited for
+            self.refresh(wait=True)
+
+        now = time.time()
+        with self._lock:
+            if self.fetched_at is None:
+                # The first load failed - nothing to show, `error` says why
+                return self.version, ()
+            expired = now - self.fetched_at >= self.ttl
+            if expired and now - self._failed_at >= self.retry_after:
+                self._start_refresh()
+            return self.version, self._data
+
+    def refresh(self, wait: bool = False):
+        """Reload now in the background (or synchronously with wait=True)"""
+        with self._lock:
+            self._start_refresh()
+            thread = self._thread
+        if wait:
+            thread.join()
+
+    @property
+    def age(self) -> Optional[float]:
+        """Seconds since the current snapshot was loaded (None if never)"""
+        return None if self.fetched_at is None else time.time() - self.fetched_at
+
+    @property
+    def is_refreshing(self) -> bool:
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+
+def load_portfolios():
+    """Fetch balances from every configured exchange"""
+    from portfolio_tracker import PortfolioTracker
+    return PortfolioTracker().get_all_portfolios()
+
+
+# Valued at 1 USD by the exchanges already
+STABLECOINS = {'USDT', 'USDC', 'BUSD', 'FDUSD', 'DAI', 'TUSD', 'USD'}
+
+
+def reprice_portfolios(portfolios, prices):
+    """Frozen copy of `portfolios` with holdings valued at `prices` (asset -> USD).
+
+    Assets without a price keep the value from the snapshot; the exchange
+    total moves by the difference, so parts not listed as balances stay in.
+    """
+    repriced = []
+    for portfolio in portfolios:
+        balances, change = [], 0.0
+        for balance in portfolio['balances']:
+            price = prices.get(balance['asset'])
+            if price is not None:
+                value = balance['total'] * price
+                change += value - balance.get('value_usdt', 0)
+                balance = dict(balance, value_usdt=value)
+            balances.append(balance)
+        repriced.append(freeze(dict(portfolio, balances=balances,
+                                    total_value_usdt=portfolio['total_value_usdt'] + change)))
+    return tuple(repriced)
+
+
+def path_version(path: str) -> Optional[tuple]:
+    """Modification stamp of a file, or of every file below a directory (None if missing)"""
+    if not os.path.isdir(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    stamps = []
+    for root, _, files in os.walk(path):
+        for name in files:
+            file_path = os.path.join(root, name)
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            stamps.append((os.path.relpath(file_path, path), stat.st_mtime_ns, stat.st_size))
+    return tuple(sorted(stamps))
+
+
+class SnapshotRegistry:
+    """Process-wide store of versioned values shared by all sessions.
+
+    get() returns the value held under `name` while its version matches and
+    builds a new one otherwise; only the newest version of each name is
+    kept, so memory does not grow with the number of viewers. Each name has
+    its own lock: concurrent sessions wait for one build of that name
+    instead of each making their own copy, and a slow build does not hold
+    up the other names.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._name_locks = {}
+        self._entries = {}
+
+    def _name_lock(self, name):
+        with self._lock:
+            return self._name_locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str, version: Hashable, build: Callable):
+        with self._name_lock(name):
+            entry = self._entries.get(name)
+            if entry is None or entry[0] != version:
+                entry = (version, build())
+                self._entries[name] = entry
+            return entry[1]
+
+    def version(self, name: str):
+        """Version currently held under `name` (None if nothing is)"""
+        entry = self._entries.get(name)
+        return None if entry is None else entry[0]
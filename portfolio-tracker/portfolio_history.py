@@ -1,66 +1,779 @@
 """
 Portfolio value history tracking
 """
+import io
 import json
 import os
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from performance_metrics import PREFIX_COLUMNS, RunningStats, prefix_sums
+
+try:
+    import fcntl
+except ImportError:  # Windows - writers are not serialized there
+    fcntl = None
+
+
+@contextmanager
+def history_lock(data_dir: str = 'portfolio_history'):
+    """Exclusive lock shared by every process writing to one history store.
+
+    Open PortfolioHistory inside the lock: an instance opened earlier holds
+    a stale copy and its save would overwrite what other writers added.
+    """
+    if fcntl is None:
+        yield
+        return
+    # Next to the directory, so creating it does not look like an existing store
+    with open(os.path.abspath(data_dir) + '.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class _ColumnTable:
+    """Equally long NumPy columns persisted as one .npy file per column.
+
+    Columns are loaded memory-mapped and only copied into growable buffers on
+    the first write, so read-only users (e.g. the dashboard) never parse or
+    copy the whole history. Matrix columns are 2D (rows x width) and can be
+    widened when new series appear; missing cells are zero. Scalar columns
+    added after the data was written load as zeros and are listed in
+    `missing` so the owner can derive them.
+
+    save() writes only what changed: rows before the first modified one are
+    known to match the files, so appended rows (the common case) are written
+    at the end of each .npy file and only its header's row count is
+    patched. Shrinking, prepending or widening rewrites the files.
+    """
+
+    def __init__(self, path: str, dtypes: Dict[str, type], matrices: Optional[Dict[str, type]] = None):
+        self.path = path
+        self.dtypes = dtypes
+        self.matrices = matrices or {}
+        self._size = 0
+        self._buffers = {name: np.empty(0, dtype=dtype) for name, dtype in dtypes.items()}
+        self._buffers.update({name: np.zeros((0, 0), dtype=dtype) for name, dtype in self.matrices.items()})
+        self._writable = True
+        self.missing = set()
+        self._disk_rows = 0   # rows in the files
+        self._disk_width = 0  # matrix width in the files
+        self._clean_rows = 0  # leading rows known to match the files
+        self.load()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def width(self):
+        """Number of columns in the matrix columns"""
+        if not self.matrices:
+            return 0
+        return self._buffers[next(iter(self.matrices))].shape[1]
+
+    def _names(self):
+        return list(self.dtypes) + list(self.matrices)
+
+    def _file(self, name):
+        return os.path.join(self.path, f"{name}.npy")
+
+    def load(self):
+        """Memory-map columns from disk if they exist"""
+        key = next(iter(self.dtypes))
+        if not os.path.exists(self._file(key)):
+            return
+        try:
+            columns = {key: np.load(self._file(key), mmap_mode='r')}
+            size = len(columns[key])
+            missing = set()
+            for name, dtype in self.dtypes.items():
+                if name == key:
+                    continue
+                if os.path.exists(self._file(name)):
+                    columns[name] = np.load(self._file(name), mmap_mode='r')
+                else:
+                    columns[name] = np.zeros(size, dtype=dtype)
+                    missing.add(name)
+            for name, dtype in self.matrices.items():
+                if os.path.exists(self._file(name)):
+                    columns[name] = np.load(self._file(name), mmap_mode='r')
+                else:
+                    # History written before this matrix existed
+                    columns[name] = np.zeros((size, 0), dtype=dtype)
+        except (OSError, ValueError) as e:
+            print(f"Error loading history columns from {self.path}: {e}")
+            return
+        widths = {columns[name].shape[1] for name in self.matrices}
+        if len(widths) > 1:
+            print(f"History columns in {self.path} have different shapes, ignoring them")
+            return
+        # A writer appending right now may have extended some columns already;
+        # the rows all columns have are complete
+        size = min(len(column) for column in columns.values())
+        self._buffers = {name: column[:size] for name, column in columns.items()}
+        self._size = size
+        self._writable = False
+        self.missing = missing
+        self._disk_rows = self._clean_rows = size
+        self._disk_width = self.width
+
+    def _mark_changed(self, index):
+        """Rows from `index` on no longer match the files"""
+        self._clean_rows = min(self._clean_rows, index)
+
+    def _write_column(self, name):
+        """Write a whole column atomically (write to temp file, then rename)"""
+        tmp_file = self._file(name) + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            np.save(f, self.column(name))
+        os.replace(tmp_file, self._file(name))
+
+    def _write_tail(self, name, start) -> bool:
+        """Write rows from `start` on into the existing file and patch its row count.
+
+        The data goes in before the header, so a concurrent reader sees
+        either the old or the new row count, never rows that are not written
+        yet. Returns False if the file cannot be patched in place.
+        """
+        fmt = np.lib.format
+        column = np.ascontiguousarray(self.column(name))
+        try:
+            with open(self._file(name), 'r+b') as f:
+                version = fmt.read_magic(f)
+                read_header = fmt.read_array_header_1_0 if version == (1, 0) else fmt.read_array_header_2_0
+                shape, fortran_order, dtype = read_header(f)
+                data_offset = f.tell()
+                if fortran_order or dtype != column.dtype or tuple(shape[1:]) != column.shape[1:]:
+                    return False
+                header = io.BytesIO()
+                write_header = fmt.write_array_header_1_0 if version == (1, 0) else fmt.write_array_header_2_0
+                write_header(header, {'descr': fmt.dtype_to_descr(column.dtype),
+                                      'fortran_order': False, 'shape': column.shape})
+                # Headers are padded for a growing row count; bail out if this one was not
+                if header.tell() != data_offset:
+                    return False
+                row_bytes = column.itemsize * int(np.prod(column.shape[1:], dtype=np.int64))
+                f.seek(data_offset + start * row_bytes)
+                f.write(column[start:].tobytes())
+                f.truncate()
+                f.seek(0)
+                f.write(header.getvalue())
+        except (OSError, ValueError) as e:
+            print(f"Error appending to {self._file(name)}: {e}")
+            return False
+        return True
+
+    def save(self):
+        """Write the rows changed since the last load/save"""
+        if self._clean_rows == self._size == self._disk_rows and self.width == self._disk_width \
+                and not self.missing:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        in_place = self._size >= self._disk_rows and self.width == self._disk_width
+        for name in self._names():
+            if in_place and os.path.exists(self._file(name)) and self._write_tail(name, self._clean_rows):
+                continue
+            self._write_column(name)
+        self.missing = set()
+        self._disk_rows = self._clean_rows = self._size
+        self._disk_width = self.width
+
+    def column(self, name):
+        """Zero-copy view of a column (rows x width for matrix columns)"""
+        return self._buffers[name][:self._size]
+
+    def _reserve(self, extra, width=None):
+        """Make sure buffers are writable and can hold `extra` more rows"""
+        needed = self._size + extra
+        width = max(self.width, width or 0)
+        capacity = len(self._buffers[next(iter(self.dtypes))])
+        if self._writable and needed <= capacity and width == self.width:
+            return
+        new_capacity = capacity if self._writable and needed <= capacity else max(needed, capacity * 2, 64)
+        for name, dtype in self.dtypes.items():
+            buffer = np.empty(new_capacity, dtype=dtype)
+            buffer[:self._size] = self._buffers[name][:self._size]
+            self._buffers[name] = buffer
+        for name, dtype in self.matrices.items():
+            old = self._buffers[name]
+            buffer = np.zeros((new_capacity, width), dtype=dtype)
+            buffer[:self._size, :old.shape[1]] = old[:self._size]
+            self._buffers[name] = buffer
+        self._writable = True
+
+    def widen(self, width):
+        """Grow matrix columns to at least `width` series"""
+        if width > self.width:
+            self._reserve(0, width)
+
+    def _set_row(self, index, name, value):
+        buffer = self._buffers[name]
+        if name in self.matrices:
+            buffer[index] = 0
+            if value is not None:
+                buffer[index, :len(value)] = value
+        else:
+            buffer[index] = value
+
+    def insert(self, row: Dict[str, float], key='timestamp'):
+        """Insert a row keeping the `key` column sorted; returns its index"""
+        keys = self.column(key)
+        index = self._size
+        if self._size and row[key] < keys[-1]:
+            index = int(np.searchsorted(keys, row[key], side='right'))
+        self._reserve(1)
+        self._mark_changed(index)
+        for name in self._names():
+            buffer = self._buffers[name]
+            if index < self._size:
+                buffer[index + 1:self._size + 1] = buffer[index:self._size]
+            self._set_row(index, name, row.get(name))
+        self._size += 1
+        return index
+
+    def update(self, index: int, values: Dict[str, float]):
+        """Overwrite some columns of an existing row"""
+        self._reserve(0)
+        self._mark_changed(index)
+        for name, value in values.items():
+            self._set_row(index, name, value)
+
+    def assign(self, name: str, start: int, values: np.ndarray):
+        """Overwrite column `name` from row `start` onwards"""
+        self._reserve(0)
+        self._mark_changed(start)
+        self._buffers[name][start:start + len(values)] = values
+
+    def _fill(self, start, count, columns):
+        for name in self._names():
+            block = self._buffers[name][start:start + count]
+            if name in self.matrices:
+                block[:] = 0
+                if name in columns:
+                    block[:, :columns[name].shape[1]] = columns[name]
+            else:
+                block[:] = columns.get(name, 0)
+
+    def extend(self, columns: Dict[str, np.ndarray]):
+        """Append many rows at once (caller keeps the key column sorted)"""
+        count = len(columns[next(iter(self.dtypes))])
+        self._reserve(count)
+        self._fill(self._size, count, columns)
+        self._size += count
+
+    def prepend(self, columns: Dict[str, np.ndarray]):
+        """Insert many rows before the first one (caller keeps the key column sorted)"""
+        count = len(columns[next(iter(self.dtypes))])
+        self._reserve(count)
+        self._mark_changed(0)
+        for name in self._names():
+            buffer = self._buffers[name]
+            buffer[count:count + self._size] = buffer[:self._size]
+        self._fill(0, count, columns)
+        self._size += count
+
+    def truncate(self, start, stop=None):
+        """Keep only rows [start:stop]"""
+        stop = self._size if stop is None else stop
+        if start == 0 and stop == self._size:
+            return
+        for name in self._names():
+            self._buffers[name] = np.array(self._buffers[name][start:stop])
+        self._mark_changed(0 if start else stop)
+        self._size = stop - start
+        self._writable = True
+
+    def clear(self):
+        """Remove all rows"""
+        self.truncate(0, 0)
+
+
+def _rollup(timestamps, values_usd, closes, width):
+    """Aggregate sorted points into OHLC buckets of `width` seconds.
+
+    `closes` maps extra column names (PLN value, position matrices) to arrays
+    whose last value in each bucket is kept.
+    """
+    buckets = timestamps - timestamps % width
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+    rollup = {
+        'timestamp': buckets[starts],
+        'open_usd': values_usd[starts],
+        'high_usd': np.maximum.reduceat(values_usd, starts),
+        'low_usd': np.minimum.reduceat(values_usd, starts),
+        'value_usd': values_usd[ends]
+    }
+    for name, values in closes.items():
+        rollup[name] = values[ends]
+    return rollup
+
 
 class PortfolioHistory:
-    """Track portfolio value over time"""
-    
-    def __init__(self, data_file='portfolio_history.json'):
-        self.data_file = data_file
-        self.history = self.load_history()
-    
-    def load_history(self):
-        """Load portfolio history from file"""
-        if os.path.exists(self.data_file):
+    """Track portfolio value over time.
+
+    History is stored column-wise (epoch seconds + values) in retention tiers:
+    raw points for 48 hours, then 5-minute, hourly and daily OHLC rollups.
+    Rollups are updated incrementally on every write, range queries are a
+    binary search on the timestamp column and return zero-copy slices.
+
+    Snapshots can also carry per-(exchange, asset) quantities and values.
+    Those are stored as dense float32 matrices (time x position id) next to
+    each tier, with the position ids dictionary-encoded in positions.json,
+    so a single position's history is a column slice.
+    """
+
+    RAW_COLUMNS = {
+        'timestamp': np.int64,
+        'value_usd': np.float64,
+        'value_pln': np.float64,
+        **{name: np.float64 for name in PREFIX_COLUMNS},
+    }
+
+    ROLLUP_COLUMNS = {
+        'timestamp': np.int64,
+        'open_usd': np.float64,
+        'high_usd': np.float64,
+        'low_usd': np.float64,
+        'value_usd': np.float64,
+        'value_pln': np.float64,
+        **{name: np.float64 for name in PREFIX_COLUMNS},
+    }
+
+    POSITION_MATRICES = {
+        'position_quantity': np.float32,
+        'position_value_usd': np.float32,
+    }
+
+    # (name, bucket width in seconds, retention in seconds or None = forever)
+    TIERS = [
+        ('raw', 0, 48 * 60 * 60),
+        ('5m', 5 * 60, 30 * 24 * 60 * 60),
+        ('1h', 60 * 60, 365 * 24 * 60 * 60),
+        ('1d', 24 * 60 * 60, None),
+    ]
+
+    # Range queries pick the finest tier that returns at most this many points
+    MAX_CHART_POINTS = 2000
+
+    def __init__(self, data_dir='portfolio_history', legacy_file='portfolio_history.json'):
+        self.data_dir = data_dir
+        self.legacy_file = legacy_file
+        is_new = not os.path.isdir(data_dir)
+        self.tiers = {}
+        for name, _, _ in self.TIERS:
+            # Raw points live in the root directory, rollups in subdirectories
+            path = data_dir if name == 'raw' else os.path.join(data_dir, name)
+            columns = self.RAW_COLUMNS if name == 'raw' else self.ROLLUP_COLUMNS
+            self.tiers[name] = _ColumnTable(path, columns, self.POSITION_MATRICES)
+        self.table = self.tiers['raw']
+        self.positions = self._load_positions()
+        self.position_ids = {key: index for index, key in enumerate(self.positions)}
+        self.stats = RunningStats.load(self._stats_file())
+        # Opening never writes: data from older versions is upgraded in
+        # memory and written by migrate() (the collector) or the next save
+        if is_new:
+            self.needs_migration = self._migrate_legacy_json()
+        elif len(self.table) and not len(self.tiers['1d']):
+            self._rebuild_rollups()
+            self.needs_migration = True
+        else:
+            self.needs_migration = self._derive_missing_columns()
+
+    def migrate(self) -> bool:
+        """Write the upgrades applied while opening the store; True if anything was written"""
+        if not self.needs_migration:
+            return False
+        self.save_history()
+        self.needs_migration = False
+        return True
+
+    def _migrate_legacy_json(self) -> bool:
+        """Import the old list-of-dicts JSON history (only before the first save)"""
+        if not self.legacy_file or not os.path.exists(self.legacy_file):
+            return False
+        try:
+            with open(self.legacy_file, 'r') as f:
+                legacy = json.load(f)
+        except:
+            return False
+        if not legacy:
+            return False
+
+        timestamps = np.array([self._to_epoch(h['timestamp']) for h in legacy], dtype=np.int64)
+        order = np.argsort(timestamps, kind='stable')
+        self.table.extend({
+            'timestamp': timestamps[order],
+            'value_usd': np.array([legacy[i].get('value_usd', 0.0) for i in order], dtype=np.float64),
+            'value_pln': np.array([legacy[i].get('value_pln', 0.0) for i in order], dtype=np.float64)
+        })
+        self._rebuild_rollups()
+        return True
+
+    def _stats_file(self):
+        return os.path.join(self.data_dir, 'metrics.json')
+
+    def _update_prefix(self, table, from_index=0):
+        """Recompute the return prefix sums of `table` from row from_index on"""
+        if from_index >= len(table):
+            return
+        base = None
+        if from_index > 0:
+            base = tuple(float(table.column(name)[from_index - 1]) for name in PREFIX_COLUMNS)
+        sums = prefix_sums(table.column('value_usd'), from_index, base)
+        for name in PREFIX_COLUMNS:
+            table.assign(name, from_index, sums[name][-(len(table) - from_index):])
+
+    def _derive_missing_columns(self) -> bool:
+        """Fill in columns (prefix sums, stats) added after the data was saved; True if any were"""
+        changed = False
+        for table in self.tiers.values():
+            if table.missing & set(PREFIX_COLUMNS):
+                self._update_prefix(table)
+                table.missing -= set(PREFIX_COLUMNS)
+                changed = True
+        if self.stats is None and (len(self.table) or len(self.tiers['1d'])):
+            # Best all-time approximation: raw points if nothing was pruned, else daily closes
+            daily = self.tiers['1d']
+            source = daily if len(daily) > len(self.table) else self.table
+            self.stats = RunningStats.from_values(source.column('value_usd'))
+            changed = True
+        return changed
+
+    def _positions_file(self):
+        return os.path.join(self.data_dir, 'positions.json')
+
+    def _load_positions(self):
+        """Load the position dictionary: index = position id"""
+        if os.path.exists(self._positions_file()):
             try:
-                with open(self.data_file, 'r') as f:
-                    return json.load(f)
+                with open(self._positions_file(), 'r') as f:
+                    return [(p['exchange'], p['asset']) for p in json.load(f)]
             except:
-                return []
+                print(f"Error loading {self._positions_file()}, position history disabled")
         return []
-    
+
+    def _save_positions(self):
+        """Save the position dictionary atomically"""
+        os.makedirs(self.data_dir, exist_ok=True)
+        tmp_file = self._positions_file() + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump([{'exchange': e, 'asset': a} for e, a in self.positions], f, indent=2)
+        os.replace(tmp_file, self._positions_file())
+
+    def _ids_for(self, keys):
+        """Position ids for (exchange, asset) keys, registering new ones"""
+        ids = []
+        for key in keys:
+            if key not in self.position_ids:
+                self.position_ids[key] = len(self.positions)
+                self.positions.append(key)
+            ids.append(self.position_ids[key])
+
+        if len(self.positions) > min(table.width for table in self.tiers.values()):
+            for table in self.tiers.values():
+                table.widen(len(self.positions))
+            self._save_positions()
+        return ids
+
+    def _encode_positions(self, positions):
+        """Turn a list of position dicts into dense quantity/value vectors"""
+        ids = self._ids_for([(p['exchange'], p['asset']) for p in positions])
+        quantities = [p.get('quantity', 0.0) for p in positions]
+        values = [p.get('value_usd', 0.0) for p in positions]
+
+        quantity_vector = np.zeros(len(self.positions), dtype=np.float32)
+        value_vector = np.zeros(len(self.positions), dtype=np.float32)
+        # np.add.at so the same key listed twice is summed, not overwritten
+        np.add.at(quantity_vector, ids, quantities)
+        np.add.at(value_vector, ids, values)
+        return quantity_vector, value_vector
+
+    @staticmethod
+    def positions_from_portfolios(portfolios):
+        """Flatten tracker portfolios into position dicts for add_snapshot"""
+        positions = []
+        for portfolio in portfolios:
+            for balance in portfolio.get('balances', []):
+                if balance.get('total', 0) > 0:
+                    positions.append({
+                        'exchange': portfolio['exchange'],
+                        'asset': balance['asset'],
+                        'quantity': balance['total'],
+                        'value_usd': balance.get('value_usdt', 0.0)
+                    })
+        return positions
+
+    def _rebuild_rollups(self):
+        """Recompute all rollup tiers from raw points, then apply retention"""
+        timestamps = self.table.column('timestamp')
+        values_usd = self.table.column('value_usd')
+        closes = {name: self.table.column(name) for name in ['value_pln'] + list(self.POSITION_MATRICES)}
+        for name, width, _ in self.TIERS[1:]:
+            self.tiers[name].clear()
+            self.tiers[name].widen(self.table.width)
+            if len(timestamps):
+                self.tiers[name].extend(_rollup(timestamps, values_usd, closes, width))
+        for table in self.tiers.values():
+            self._update_prefix(table)
+        self.stats = RunningStats.from_values(values_usd)
+        self._apply_retention()
+
+    @staticmethod
+    def _to_epoch(timestamp) -> int:
+        """Convert ISO string / datetime / number to epoch seconds"""
+        if timestamp is None:
+            return int(datetime.now().timestamp())
+        if isinstance(timestamp, str):
+            return int(datetime.fromisoformat(timestamp).timestamp())
+        if isinstance(timestamp, datetime):
+            return int(timestamp.timestamp())
+        return int(timestamp)
+
     def save_history(self):
-        """Save portfolio history to file"""
-        with open(self.data_file, 'w') as f:
-            json.dump(self.history, f, indent=2)
-    
-    def add_snapshot(self, total_value_usd: float, total_value_pln: float, timestamp: str = None):
-        """Add a portfolio value snapshot"""
-        snapshot = {
-            'timestamp': timestamp or datetime.now().isoformat(),
+        """Save portfolio history to disk"""
+        for table in self.tiers.values():
+            table.save()
+        if self.stats is not None:
+            self.stats.save(self._stats_file())
+
+    def clear_history(self):
+        """Remove all stored snapshots"""
+        for table in self.tiers.values():
+            table.clear()
+        self.stats = RunningStats()
+        self.save_history()
+
+    def _update_rollup(self, table, width, epoch, value_usd, closes):
+        """Fold one point into the matching OHLC bucket of a rollup tier"""
+        bucket = epoch - epoch % width
+        timestamps = table.column('timestamp')
+        index = int(np.searchsorted(timestamps, bucket))
+        if index == len(timestamps) or timestamps[index] != bucket:
+            index = table.insert(dict(closes, **{
+                'timestamp': bucket,
+                'open_usd': value_usd,
+                'high_usd': value_usd,
+                'low_usd': value_usd,
+                'value_usd': value_usd
+            }))
+            self._update_prefix(table, index)
+            return
+
+        row = {
+            'high_usd': max(table.column('high_usd')[index], value_usd),
+            'low_usd': min(table.column('low_usd')[index], value_usd)
+        }
+        if index == len(timestamps) - 1:
+            # Only the newest bucket can still move its close
+            row['value_usd'] = value_usd
+            row.update(closes)
+        table.update(index, row)
+        self._update_prefix(table, index)
+
+    def _apply_retention(self, now: Optional[int] = None):
+        """Drop rows older than each tier's retention window"""
+        now = int(datetime.now().timestamp()) if now is None else now
+        for name, _, retention in self.TIERS:
+            if retention is None:
+                continue
+            table = self.tiers[name]
+            expired = int(np.searchsorted(table.column('timestamp'), now - retention, side='left'))
+            # Compact in batches so a steady stream of writes does not copy every time
+            if expired and expired >= max(1, len(table) // 20):
+                table.truncate(expired)
+
+    def add_snapshot(self, total_value_usd: float, total_value_pln: float, timestamp: str = None,
+                     positions: Optional[List[Dict]] = None):
+        """Add a portfolio value snapshot
+
+        Args:
+            positions: Optional list of {'exchange', 'asset', 'quantity',
+                'value_usd'} dicts, see positions_from_portfolios()
+        """
+        epoch = self._to_epoch(timestamp)
+        closes = {'value_pln': total_value_pln}
+        if positions:
+            closes['position_quantity'], closes['position_value_usd'] = self._encode_positions(positions)
+
+        index = self.table.insert(dict(closes, timestamp=epoch, value_usd=total_value_usd))
+        self._update_prefix(self.table, index)
+        if self.stats is None:
+            self.stats = RunningStats()
+        if index == len(self.table) - 1:
+            # Running statistics only follow the series forwards in time
+            self.stats.update(total_value_usd)
+        for name, width, _ in self.TIERS[1:]:
+            self._update_rollup(self.tiers[name], width, epoch, total_value_usd, closes)
+
+        self._apply_retention()
+        self.save_history()
+        return {
+            'timestamp': datetime.fromtimestamp(epoch).isoformat(),
             'value_usd': total_value_usd,
             'value_pln': total_value_pln
         }
-        self.history.append(snapshot)
-        
-        # Keep only last 1000 snapshots
-        if len(self.history) > 1000:
-            self.history = self.history[-1000:]
-        
+
+    def backfill(self, timestamps, values_usd, values_pln, positions: Optional[List] = None,
+                 quantities=None, position_values=None):
+        """Prepend reconstructed daily points to the daily tier.
+
+        Only days before the first recorded point are written, real
+        snapshots always win. Positions are (exchange, asset) keys matching
+        the columns of the quantities / position_values matrices.
+
+        Returns:
+            Number of days written
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        daily = self.tiers['1d']
+        first = int(daily.column('timestamp')[0]) if len(daily) else None
+        if first is None and len(self.table):
+            first = int(self.table.column('timestamp')[0])
+        days = timestamps - timestamps % (24 * 60 * 60)
+        keep = days < first if first is not None else np.ones(len(days), dtype=bool)
+        if not keep.any():
+            return 0
+
+        values_usd = np.asarray(values_usd, dtype=np.float64)[keep]
+        columns = {
+            'timestamp': days[keep],
+            'open_usd': values_usd,
+            'high_usd': values_usd,
+            'low_usd': values_usd,
+            'value_usd': values_usd,
+            'value_pln': np.asarray(values_pln, dtype=np.float64)[keep]
+        }
+        if positions:
+            ids = self._ids_for([tuple(key) for key in positions])
+            for name, matrix in (('position_quantity', quantities), ('position_value_usd', position_values)):
+                if matrix is None:
+                    continue
+                dense = np.zeros((int(keep.sum()), len(self.positions)), dtype=np.float32)
+                dense[:, ids] = np.asarray(matrix)[keep]
+                columns[name] = dense
+
+        daily.prepend(columns)
+        self._update_prefix(daily)
+        # The raw tier no longer starts the series - daily closes are the best all-time source
+        self.stats = RunningStats.from_values(daily.column('value_usd'))
         self.save_history()
-        return snapshot
-    
+        return int(keep.sum())
+
+    def select_tier(self, start: Optional[int] = None, end: Optional[int] = None,
+                    max_points: Optional[int] = None):
+        """Pick the finest tier that covers [start, end] within max_points"""
+        max_points = max_points or self.MAX_CHART_POINTS
+        now = int(datetime.now().timestamp())
+        daily = self.tiers['1d'].column('timestamp')
+        if start is None:
+            start = int(daily[0]) if len(daily) else now
+
+        # A tier covers the range if it reaches back to `start`, or if nothing
+        # older exists anywhere (young history, no backfill)
+        oldest = int(daily[0]) if len(daily) else now
+        for name, _, retention in self.TIERS:
+            timestamps = self.tiers[name].column('timestamp')
+            if not len(timestamps):
+                continue
+            first_day = int(timestamps[0]) - int(timestamps[0]) % (24 * 60 * 60)
+            covers = retention is None or first_day <= max(start, oldest)
+            if not covers:
+                continue
+            lo = int(np.searchsorted(timestamps, start, side='left'))
+            hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side='right'))
+            if hi - lo <= max_points:
+                return name
+        return self.TIERS[-1][0]
+
+    def get_range(self, start: Optional[int] = None, end: Optional[int] = None,
+                  tier: Optional[str] = None, max_points: Optional[int] = None):
+        """Get columns for snapshots with start <= timestamp <= end (epoch seconds).
+
+        The tier is chosen automatically unless given. Returns a dict of
+        zero-copy NumPy slices; 'timestamp' is exposed as datetime64[s] so it
+        can be passed straight to pandas/Plotly. Rollup tiers also return
+        open/high/low columns, 'value_usd'/'value_pln' are always the close.
+        """
+        table = self.tiers[tier or self.select_tier(start, end, max_points)]
+        timestamps = table.column('timestamp')
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side='right'))
+        if lo >= hi:
+            return {}
+        data = {'timestamp': timestamps[lo:hi].view('datetime64[s]')}
+        for name in table.dtypes:
+            if name != 'timestamp':
+                data[name] = table.column(name)[lo:hi]
+        return data
+
+    def get_positions(self):
+        """List of (exchange, asset) keys ever recorded, indexed by position id"""
+        return list(self.positions)
+
+    def get_position_series(self, exchange: Optional[str] = None, asset: Optional[str] = None,
+                            start: Optional[int] = None, end: Optional[int] = None,
+                            tier: Optional[str] = None):
+        """Quantity and USD value over time for one position or a group.
+
+        With both exchange and asset the result is a zero-copy column slice;
+        with only one of them the matching positions are summed (e.g. BTC on
+        all exchanges, or everything held on Binance).
+        """
+        ids = [index for index, (e, a) in enumerate(self.positions)
+               if (exchange is None or e == exchange) and (asset is None or a == asset)]
+        if not ids:
+            return {}
+
+        table = self.tiers[tier or self.select_tier(start, end)]
+        timestamps = table.column('timestamp')
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side='right'))
+        if lo >= hi:
+            return {}
+
+        quantity = table.column('position_quantity')[lo:hi]
+        value = table.column('position_value_usd')[lo:hi]
+        if len(ids) == 1:
+            # Tables written before the position existed are narrower
+            if ids[0] >= table.width:
+                return {}
+            quantity, value = quantity[:, ids[0]], value[:, ids[0]]
+        else:
+            ids = [i for i in ids if i < table.width]
+            quantity, value = quantity[:, ids].sum(axis=1), value[:, ids].sum(axis=1)
+        return {
+            'timestamp': timestamps[lo:hi].view('datetime64[s]'),
+            'quantity': quantity,
+            'value_usd': value
+        }
+
     def get_chart_data(self, days: int = 30):
-        """Get data for chart visualization"""
-        if not self.history:
-            return []
-        
-        # Filter by days if specified
+        """Get data for chart visualization (dict of columns, empty if no data)"""
         if days > 0:
-            cutoff_date = datetime.now().timestamp() - (days * 24 * 60 * 60)
-            filtered = [h for h in self.history 
-                       if datetime.fromisoformat(h['timestamp']).timestamp() > cutoff_date]
-            return filtered
-        
-        return self.history
-    
+            cutoff = int(datetime.now().timestamp()) - days * 24 * 60 * 60
+            return self.get_range(start=cutoff + 1)
+        return self.get_range()
+
+    @property
+    def version(self):
+        """Changes with every appended snapshot, backfill or retention pass"""
+        newest = int(self.table.column('timestamp')[-1]) if len(self.table) else 0
+        return (len(self.table), len(self.tiers['1d']), newest)
+
     def get_latest_value(self):
         """Get latest portfolio value"""
-        if not self.history:
+        table = self.table if len(self.table) else self.tiers['1d']
+        if not len(table):
             return None
-        return self.history[-1]
-
+        return {
+            'timestamp': datetime.fromtimestamp(int(table.column('timestamp')[-1])).isoformat(),
+            'value_usd': float(table.column('value_usd')[-1]),
+            'value_pln': float(table.column('value_pln')[-1])
+        }
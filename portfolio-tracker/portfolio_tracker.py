@@ -2,7 +2,6 @@
 Unified portfolio tracker for multiple exchanges
 """
 from exchanges import BinanceClient, BybitClient
-from tabulate import tabulate
 
 class PortfolioTracker:
     """Main portfolio tracker class"""
@@ -58,6 +57,7 @@ class PortfolioTracker:
     
     def display_portfolio(self):
         """Display portfolio information in a formatted table"""
+        from tabulate import tabulate
         portfolios = self.get_all_portfolios()
         
         if not portfolios:
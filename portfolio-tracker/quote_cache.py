@@ -0,0 +1,160 @@
+"""
+Stock and crypto quote cache with market-hours-aware expiry and request coalescing
+"""
+import threading
+from datetime import datetime, time, timedelta
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+import requests
+
+from stock_prices import get_multiple_stock_prices
+
+# Yahoo symbol suffix -> (timezone, session open, session close); no suffix = US
+MARKET_SESSIONS = {
+    '': ('America/New_York', time(9, 30), time(16, 0)),
+    '.WA': ('Europe/Warsaw', time(9, 0), time(17, 0)),
+    '.L': ('Europe/London', time(8, 0), time(16, 30)),
+    '.DE': ('Europe/Berlin', time(9, 0), time(17, 30)),
+    '.F': ('Europe/Berlin', time(8, 0), time(22, 0)),
+    '.PA': ('Europe/Paris', time(9, 0), time(17, 30)),
+    '.AS': ('Europe/Amsterdam', time(9, 0), time(17, 30)),
+    '.MI': ('Europe/Rome', time(9, 0), time(17, 30)),
+    '.SW': ('Europe/Zurich', time(9, 0), time(17, 30)),
+    '.TO': ('America/Toronto', time(9, 30), time(16, 0)),
+    '.T': ('Asia/Tokyo', time(9, 0), time(15, 0)),
+    '.HK': ('Asia/Hong_Kong', time(9, 30), time(16, 0)),
+}
+
+
+def market_session(symbol: str):
+    """(timezone, open, close) of the exchange listing `symbol`, None if it trades around the clock"""
+    # FX pairs (EURUSD=X) and crypto pairs (BTC-USD) are quoted continuously
+    if symbol.endswith('=X') or symbol.endswith('-USD'):
+        return None
+    suffix = symbol[symbol.rfind('.'):].upper() if '.' in symbol else ''
+    return MARKET_SESSIONS.get(suffix, MARKET_SESSIONS[''])
+
+
+def next_open(symbol: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """Start of the next trading session, or None while the market is open.
+
+    Weekends are skipped; exchange holidays are not known, so a holiday just
+    costs one extra refresh at the usual opening time.
+    """
+    session = market_session(symbol)
+    if session is None:
+        return None
+    zone, open_time, close_time = session
+    local = (now or datetime.now(ZoneInfo('UTC'))).astimezone(ZoneInfo(zone))
+    if local.weekday() < 5 and open_time <= local.time() < close_time:
+        return None
+
+    day = local.date() if local.time() < open_time else local.date() + timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return datetime.combine(day, open_time, tzinfo=ZoneInfo(zone))
+
+
+class QuoteCache:
+    """Process-wide symbol -> price cache.
+
+    While a symbol's market is open its quote lives for `open_ttl` seconds;
+    once the session has closed the last price is kept until the next open.
+    Callers asking for a symbol that another thread is already fetching
+    wait for that request instead of sending their own.
+    """
+
+    def __init__(self, open_ttl: int = 60, fetch_many=get_multiple_stock_prices):
+        self.open_ttl = open_ttl
+        self.fetch_many = fetch_many
+        self._lock = threading.Lock()
+        self._quotes = {}     # symbol -> (price, expires_at)
+        self._in_flight = {}  # symbol -> threading.Event set when the fetch finishes
+
+    def _expiry(self, symbol: str, now: datetime) -> datetime:
+        reopen = next_open(symbol, now)
+        return reopen if reopen is not None else now + timedelta(seconds=self.open_ttl)
+
+    def get_many(self, symbols: List[str]) -> Dict[str, float]:
+        """Prices for all symbols, fetching only the expired ones (one batch call)"""
+        now = datetime.now(ZoneInfo('UTC'))
+        prices, to_fetch, to_wait = {}, [], {}
+        with self._lock:
+            for symbol in dict.fromkeys(symbols):
+                cached = self._quotes.get(symbol)
+                if cached and cached[1] > now:
+                    prices[symbol] = cached[0]
+                elif symbol in self._in_flight:
+                    to_wait[symbol] = self._in_flight[symbol]
+                else:
+                    self._in_flight[symbol] = threading.Event()
+                    to_fetch.append(symbol)
+
+        if to_fetch:
+            fetched = {}
+            try:
+                fetched = self.fetch_many(to_fetch)
+            finally:
+                with self._lock:
+                    for symbol in to_fetch:
+                        if symbol in fetched:
+                            self._quotes[symbol] = (fetched[symbol], self._expiry(symbol, now))
+                        self._in_flight.pop(symbol).set()
+            prices.update(fetched)
+
+        for symbol, event in to_wait.items():
+            event.wait()
+            cached = self._quotes.get(symbol)
+            if cached:
+                prices[symbol] = cached[0]
+        return prices
+
+    def invalidate(self, symbols: Optional[List[str]] = None):
+        """Drop cached quotes (all of them if no symbols are given)"""
+        with self._lock:
+            if symbols is None:
+                self._quotes.clear()
+            else:
+                for symbol in symbols:
+                    self._quotes.pop(symbol, None)
+
+
+quote_cache = QuoteCache()
+
+
+def get_cached_stock_prices(symbols: List[str]) -> Dict[str, float]:
+    """Drop-in for get_multiple_stock_prices() backed by the shared quote cache"""
+    return quote_cache.get_many(symbols)
+
+
+def fetch_binance_prices(symbols: List[str]) -> Dict[str, float]:
+    """Last Binance price for ASSET-USD keys, read from the ASSET/USDT pairs.
+
+    One request returns every ticker; assets without a USDT pair are missing.
+    """
+    try:
+        response = requests.get('https://api.binance.com/api/v3/ticker/price', timeout=5)
+        if response.status_code != 200:
+            print(f"Binance ticker request failed: HTTP {response.status_code}")
+            return {}
+        tickers = {ticker['symbol']: float(ticker['price']) for ticker in response.json()}
+    except Exception as e:
+        print(f"Error fetching Binance tickers: {e}")
+        return {}
+    prices = {}
+    for symbol in symbols:
+        pair = symbol[:-len('-USD')] + 'USDT'
+        if tickers.get(pair):
+            prices[symbol] = tickers[pair]
+    return prices
+
+
+# Keys use the ASSET-USD form, which the cache treats as trading around the clock
+crypto_quote_cache = QuoteCache(fetch_many=fetch_binance_prices)
+
+
+def get_cached_crypto_prices(assets: List[str]) -> Dict[str, float]:
+    """USD price per crypto asset from the shared cache (missing if Binance has no USDT pair)"""
+    prices = crypto_quote_cache.get_many([f"{asset}-USD" for asset in assets])
+    return {symbol[:-len('-USD')]: price for symbol, price in prices.items()}
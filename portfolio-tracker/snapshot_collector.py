@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Headless snapshot collector - records portfolio history independently of the Streamlit UI
+"""
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+
+from config import Config
+from portfolio_history import PortfolioHistory, history_lock
+from portfolio_tracker import PortfolioTracker
+from utils import get_usd_to_pln_rate
+
+DEFAULT_INTERVAL = int(os.getenv('SNAPSHOT_INTERVAL', '300'))
+
+
+class SnapshotCollector:
+    """Poll balances and prices on a schedule and append snapshots to the history store"""
+
+    def __init__(self, interval: int = DEFAULT_INTERVAL, data_dir: str = 'portfolio_history'):
+        self.interval = interval
+        self.data_dir = data_dir
+        self.tracker = None
+        self._stop = threading.Event()
+
+    def stop(self, signum=None, frame=None):
+        """Ask the loop to finish after the current snapshot"""
+        if signum is not None:
+            print(f"\n⏹️  Received signal {signum}, stopping collector...")
+        self._stop.set()
+
+    def migrate(self):
+        """Write history upgrades (legacy import, rollups, new columns) - readers never do"""
+        with history_lock(self.data_dir):
+            migrated = PortfolioHistory(self.data_dir).migrate()
+        if migrated:
+            print("✓ History store upgraded")
+
+    def collect_once(self):
+        """Fetch all portfolios and write one snapshot; returns it or None"""
+        if self.tracker is None:
+            self.tracker = PortfolioTracker()
+
+        portfolios = self.tracker.get_all_portfolios()
+        total_value_usd = sum(p['total_value_usdt'] for p in portfolios)
+
+        # Every exchange failing looks like a zero balance - don't record it as a crash
+        if total_value_usd <= 0:
+            print("⚠️  No portfolio value returned, skipping snapshot")
+            return None
+
+        usd_to_pln = get_usd_to_pln_rate()
+
+        # Re-open the store each time so resets and backfills from other processes are respected
+        with history_lock(self.data_dir):
+            history = PortfolioHistory(self.data_dir)
+            snapshot = history.add_snapshot(
+                total_value_usd,
+                total_value_usd * usd_to_pln,
+                positions=PortfolioHistory.positions_from_portfolios(portfolios)
+            )
+        print(f"✓ {snapshot['timestamp']}  ${total_value_usd:,.2f}")
+        return snapshot
+
+    def run(self):
+        """Collect snapshots until SIGTERM/SIGINT"""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        self.migrate()
+        print(f"📸 Collecting snapshots every {self.interval}s (Ctrl+C to stop)")
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.collect_once()
+            except Exception as e:
+                print(f"❌ Snapshot failed: {e}")
+
+            # Keep a fixed schedule regardless of how long the exchanges took
+            elapsed = time.monotonic() - started
+            self._stop.wait(max(0.0, self.interval - elapsed))
+
+        print("✅ Collector stopped")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Record portfolio snapshots in the background")
+    parser.add_argument('--interval', type=int, default=DEFAULT_INTERVAL,
+                        help=f"seconds between snapshots (default: {DEFAULT_INTERVAL})")
+    parser.add_argument('--once', action='store_true', help="take a single snapshot and exit")
+    parser.add_argument('--migrate', action='store_true', help="upgrade the history store and exit")
+    args = parser.parse_args()
+
+    missing = Config.validate()
+    if missing:
+        print(f"⚠️  Missing credentials for: {', '.join(missing)}")
+
+    collector = SnapshotCollector(interval=args.interval)
+    if args.migrate:
+        collector.migrate()
+        sys.exit(0)
+    if args.once:
+        sys.exit(0 if collector.collect_once() else 1)
+    collector.run()
+
+
+if __name__ == "__main__":
+    main()
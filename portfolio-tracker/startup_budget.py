@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Startup budget check - time until each entry point can draw its first output
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Seconds allowed for the imports an entry point runs before its first output
+BUDGETS = {
+    'main.py': 0.5,
+    'streamlit_app.py': 2.0,
+    'pages/1_kryptowaluty.py': 2.0,
+    'pages/2_akcje.py': 2.0,
+}
+
+# Libraries that must not be loaded before the first paint
+HEAVY_MODULES = ['binance', 'pybit', 'plotly', 'tabulate', 'pandas']
+
+# Imported before the entry point's own imports; heavy modules these already
+# load (streamlit pulls in plotly) are the framework's cost, not the page's
+BASELINE_IMPORTS = ['import streamlit']
+
+# Calls that configure the page but draw nothing
+NON_PAINTING_CALLS = {'set_page_config'}
+
+
+def _is_paint(statement) -> bool:
+    """True for a top-level statement that calls a function (draws output)"""
+    if not isinstance(statement, ast.Expr) or not isinstance(statement.value, ast.Call):
+        return False
+    func = statement.value.func
+    name = func.attr if isinstance(func, ast.Attribute) else getattr(func, 'id', '')
+    return name not in NON_PAINTING_CALLS
+
+
+def first_paint_imports(path: str):
+    """Import statements a script executes before its first output"""
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    imports = []
+    for statement in tree.body:
+        if _is_paint(statement):
+            break
+        # Pages wrap their imports in try/except ImportError
+        block = statement.body if isinstance(statement, ast.Try) else [statement]
+        for node in block:
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                imports.append(ast.unparse(node))
+    return imports
+
+
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+{baseline}
+baseline = time.perf_counter() - start if {baseline_used} else 0.0
+preloaded = set(sys.modules)
+{imports}
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules and m not in preloaded]
+print(json.dumps({{'seconds': elapsed, 'baseline': baseline, 'heavy': heavy}}))
+'''
+
+
+def _uses_streamlit(imports) -> bool:
+    return any(line.split()[1].split('.')[0] == 'streamlit' for line in imports)
+
+
+def measure(entry: str) -> dict:
+    """Run the entry point's pre-paint imports in a fresh interpreter"""
+    imports = first_paint_imports(os.path.join(BASE_DIR, entry))
+    baseline = BASELINE_IMPORTS if _uses_streamlit(imports) else []
+    probe = PROBE.format(baseline='\n'.join(baseline), baseline_used=bool(baseline), imports='\n'.join(imports), heavy=HEAVY_MODULES)
+    # Pages import from the project root, like `streamlit run` does
+    result = subprocess.run([sys.executable, '-c', probe], cwd=BASE_DIR,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return {'error': result.stderr.strip().splitlines()[-1] if result.stderr else 'failed'}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Check cold-start import time of the entry points")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per entry point, the fastest counts")
+    parser.add_argument('entries', nargs='*', help="entry points to check (default: all)")
+    args = parser.parse_args()
+
+    failed = False
+    for entry in args.entries or BUDGETS:
+        budget = BUDGETS.get(entry, 2.0)
+        runs = [measure(entry) for _ in range(max(1, args.repeat))]
+        errors = [run['error'] for run in runs if 'error' in run]
+        if errors:
+            print(f"❌ {entry}: {errors[0]}")
+            failed = True
+            continue
+
+        best = min(runs, key=lambda run: run['seconds'])
+        over = best['seconds'] > budget
+        status = '❌' if over or best['heavy'] else '✅'
+        baseline = f", {best['baseline'] * 1000:.0f} ms of it importing streamlit" if best['baseline'] else ""
+        print(f"{status} {entry}: {best['seconds'] * 1000:.0f} ms (budget {budget * 1000:.0f} ms{baseline})")
+        if best['heavy']:
+            print(f"   loaded before first paint: {', '.join(best['heavy'])}")
+        failed = failed or over or bool(best['heavy'])
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,60 +3,305 @@ Get stock prices from Yahoo Finance API
 """
 import requests
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from fx_rates import fx_rates
+
+YAHOO_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# Symbols per request to the multi-symbol quote endpoint
+QUOTE_BATCH_SIZE = 50
+
+# Worker threads for the per-symbol fallback
+MAX_WORKERS = 8
+
+# Maximum symbols Yahoo accepts per spark request
+SPARK_BATCH_SIZE = 20
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing requests at least 1/rate seconds apart"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        """Block until the caller may send its request"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# Shared by every Yahoo request in the process, whichever thread sends it
+yahoo_rate_limiter = RateLimiter(rate=20)
+
+
+class ChartMetaCache:
+    """Cache of the `meta` block of v8/finance/chart/{symbol} responses.
+
+    Valid symbols are kept for `ttl` seconds (the meta carries the live
+    price), symbols Yahoo reports as unknown for `negative_ttl` seconds so
+    typos and delisted tickers are not refetched on every rerun. Network
+    errors and throttling are not cached at all.
+    """
+
+    def __init__(self, ttl: int = 60, negative_ttl: int = 6 * 60 * 60):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._entries = {}  # symbol -> (meta or None, expires_at)
+
+    def get(self, symbol):
+        """
+        Get chart metadata for a symbol
+
+        Args:
+            symbol: Stock symbol (e.g., 'AAPL', 'TSLA')
+
+        Returns:
+            The meta dict (regularMarketPrice, currency, exchangeName,
+            longName, ...) or None if the symbol is unknown or unreachable
+        """
+        symbol = symbol.upper()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(symbol)
+        if entry and entry[1] > now:
+            return entry[0]
+
+        try:
+            # Yahoo Finance API (free, no key needed)
+            url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
+
+            yahoo_rate_limiter.wait()
+            response = requests.get(url, headers=YAHOO_HEADERS, timeout=5)
+
+            meta = None
+            if response.status_code == 200:
+                result = (response.json().get('chart', {}).get('result') or [{}])[0]
+                meta = result.get('meta')
+            elif response.status_code != 404:
+                # Throttling / server errors say nothing about the symbol
+                return None
+        except Exception as e:
+            print(f"Error fetching chart metadata for {symbol}: {e}")
+            return None
+
+        ttl = self.ttl if meta else self.negative_ttl
+        with self._lock:
+            self._entries[symbol] = (meta, now + ttl)
+        return meta
+
+    def clear(self):
+        """Forget all cached metadata"""
+        with self._lock:
+            self._entries.clear()
+
+
+chart_meta_cache = ChartMetaCache()
+
+
+def get_chart_meta(symbol):
+    """Cached `meta` block of the Yahoo chart endpoint, None if unavailable"""
+    return chart_meta_cache.get(symbol)
+
 
 def get_stock_price(symbol):
     """
     Get current stock price from Yahoo Finance
-    
+
     Args:
         symbol: Stock symbol (e.g., 'AAPL', 'TSLA')
-    
+
     Returns:
-        Current price or None if not found
-    """
-    try:
-        # Yahoo Finance API (free, no key needed)
-        url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=5)
-        
-        if response.status_code == 200:
-            data = response.json()
-            
-            if 'chart' in data and 'result' in data['chart']:
-                result = data['chart']['result'][0]
-                
-                if 'meta' in result and 'regularMarketPrice' in result['meta']:
-                    return result['meta']['regularMarketPrice']
-        
-        return None
-    except Exception as e:
-        print(f"Error fetching stock price for {symbol}: {e}")
-        return None
+        Current price in USD or None if not found
+    """
+    meta = get_chart_meta(symbol)
+    if meta and 'regularMarketPrice' in meta:
+        return fx_rates.to_usd(meta['regularMarketPrice'], meta.get('currency'))
+    return None
 
-def get_multiple_stock_prices(symbols):
+# Quote currency per symbol - a listing's currency does not change, so
+# entries are kept for the life of the process
+_quote_currencies = {}
+_quote_currencies_lock = threading.Lock()
+
+
+def _fetch_quotes(symbols):
+    """Raw v7 quote dicts by symbol, QUOTE_BATCH_SIZE symbols per request.
+
+    Symbols Yahoo did not return are missing; the whole batch is missing if
+    the endpoint fails. Every currency seen is remembered for later lookups.
     """
-    Get current prices for multiple stocks
-    
+    quotes = {}
+
+    for i in range(0, len(symbols), QUOTE_BATCH_SIZE):
+        chunk = symbols[i:i + QUOTE_BATCH_SIZE]
+        try:
+            yahoo_rate_limiter.wait()
+            response = requests.get(
+                "https://query1.finance.yahoo.com/v7/finance/quote",
+                params={'symbols': ','.join(chunk)},
+                headers=YAHOO_HEADERS,
+                timeout=5
+            )
+            if response.status_code != 200:
+                print(f"Batch quote request failed: HTTP {response.status_code}")
+                continue
+
+            for quote in response.json().get('quoteResponse', {}).get('result', []):
+                quotes[quote['symbol']] = quote
+        except Exception as e:
+            print(f"Error fetching batch quotes: {e}")
+
+    with _quote_currencies_lock:
+        _quote_currencies.update({symbol: quote['currency'] for symbol, quote in quotes.items()
+                                  if quote.get('currency')})
+    return quotes
+
+def get_batch_quotes(symbols):
+    """
+    Get current prices for many stocks from the multi-symbol quote endpoint
+
     Args:
         symbols: List of stock symbols
-    
+
     Returns:
-        Dictionary with symbol -> price mapping
+        Dictionary with symbol -> price in USD (symbols Yahoo did not
+        return are missing; the whole batch is missing if the endpoint fails)
     """
     prices = {}
-    
-    for symbol in symbols:
-        price = get_stock_price(symbol)
+    for symbol, quote in _fetch_quotes(symbols).items():
+        price = quote.get('regularMarketPrice')
         if price:
-            prices[symbol] = price
-        # Small delay to avoid rate limiting
-        import time
-        time.sleep(0.1)
-    
+            prices[symbol] = fx_rates.to_usd(price, quote.get('currency'))
     return prices
 
+def get_multiple_stock_prices(symbols):
+    """
+    Get current prices for multiple stocks
+
+    One batched quote request per QUOTE_BATCH_SIZE symbols; anything the
+    batch did not return is fetched per symbol on a bounded thread pool,
+    with all requests going through the shared rate limiter.
+
+    Args:
+        symbols: List of stock symbols
+
+    Returns:
+        Dictionary with symbol -> price in USD
+    """
+    symbols = list(dict.fromkeys(symbols))
+    prices = get_batch_quotes(symbols)
+
+    missing = [symbol for symbol in symbols if symbol not in prices]
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(missing))) as executor:
+            for symbol, price in zip(missing, executor.map(get_stock_price, missing)):
+                if price:
+                    prices[symbol] = price
+
+    return prices
+
+def _parse_spark_entry(entry):
+    """Spark result for one symbol -> (epoch seconds, closes, currency or None) without null rows"""
+    timestamps = entry.get('timestamp') or []
+    closes = entry.get('close')
+    if closes is None:
+        # v8 layout: {'timestamp': [...], 'indicators': {'quote': [{'close': [...]}]}}
+        closes = entry.get('indicators', {}).get('quote', [{}])[0].get('close') or []
+    timestamps = np.array(timestamps, dtype=np.int64)
+    # None -> NaN through the float conversion
+    closes = np.array(closes, dtype=np.float64)
+    keep = ~np.isnan(closes)
+    # Only the chart-style layout carries a meta block
+    currency = (entry.get('meta') or {}).get('currency')
+    return timestamps[keep], closes[keep], currency
+
+def _spark_currencies(symbols):
+    """Quote currency per symbol, unknown ones fetched in batched quote requests.
+
+    Symbols Yahoo has no currency for are missing.
+    """
+    with _quote_currencies_lock:
+        missing = [symbol for symbol in symbols if symbol not in _quote_currencies]
+    if missing:
+        _fetch_quotes(missing)
+    with _quote_currencies_lock:
+        return {symbol: _quote_currencies[symbol] for symbol in symbols if symbol in _quote_currencies}
+
+def get_spark_history(symbols, period='1y', interval='1d'):
+    """
+    Get closing price history for many stocks with batched spark requests
+
+    Symbols are sent SPARK_BATCH_SIZE at a time, so N holdings cost
+    ceil(N / 20) requests instead of N chart calls.
+
+    Args:
+        symbols: List of stock symbols
+        period: Yahoo range ('1mo', '3mo', '1y', '5y', 'max', ...)
+        interval: Candle interval ('1d', '1wk', ...)
+
+    Returns:
+        Dictionary with symbol -> (timestamps, closes in USD) NumPy arrays
+        (timestamps in epoch seconds); symbols without data are missing
+    """
+    symbols = list(dict.fromkeys(symbols))
+    parsed = {}
+
+    for i in range(0, len(symbols), SPARK_BATCH_SIZE):
+        chunk = symbols[i:i + SPARK_BATCH_SIZE]
+        try:
+            yahoo_rate_limiter.wait()
+            response = requests.get(
+                "https://query1.finance.yahoo.com/v8/finance/spark",
+                params={'symbols': ','.join(chunk), 'range': period, 'interval': interval},
+                headers=YAHOO_HEADERS,
+                timeout=10
+            )
+            if response.status_code != 200:
+                print(f"Spark request failed: HTTP {response.status_code}")
+                continue
+
+            data = response.json()
+            if 'spark' in data:
+                # {'spark': {'result': [{'symbol': ..., 'response': [entry]}]}}
+                entries = {r['symbol']: (r.get('response') or [{}])[0]
+                           for r in data['spark'].get('result') or []}
+            else:
+                # {'AAPL': entry, 'MSFT': entry}
+                entries = data
+
+            for symbol, entry in entries.items():
+                if not entry:
+                    continue
+                timestamps, closes, currency = _parse_spark_entry(entry)
+                if len(closes):
+                    parsed[symbol] = (timestamps, closes, currency)
+        except Exception as e:
+            print(f"Error fetching spark history: {e}")
+
+    # The spark layout has no currency - LSE closes are in pence, EU ones in EUR
+    currencies = _spark_currencies([symbol for symbol, (_, _, currency) in parsed.items() if not currency])
+    history = {}
+    for symbol, (timestamps, closes, currency) in parsed.items():
+        currency = currency or currencies.get(symbol)
+        if currency is None and '.' in symbol:
+            # A suffixed listing is unlikely to trade in USD - better missing than wrong
+            print(f"Unknown quote currency for {symbol}, skipping its price history")
+            continue
+        # Converted at today's rate - good enough for trends, not for accounting
+        history[symbol] = (timestamps, fx_rates.to_usd(closes, currency))
+
+    return history
@@ -3,6 +3,10 @@ Stock symbol validation and search
 """
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
+
+from instrument_master import get_instrument_master
+from stock_prices import MAX_WORKERS, get_chart_meta
 
 def get_popular_stocks():
     """Get list of popular stock symbols"""
@@ -70,30 +74,46 @@ def validate_stock_symbol(symbol):
     Returns:
         Tuple: (is_valid, stock_name or None)
     """
-    try:
-        # Yahoo Finance API
-        url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=5)
-        
-        if response.status_code == 200:
-            data = response.json()
-            
-            if 'chart' in data and 'result' in data['chart']:
-                result = data['chart']['result'][0]
-                
-                if 'meta' in result:
-                    stock_name = result['meta'].get('longName') or result['meta'].get('shortName', symbol)
-                    return True, stock_name
-        
-        return False, None
-    except Exception as e:
-        print(f"Error validating stock symbol {symbol}: {e}")
-        return False, None
+    # Known listings are answered offline
+    instrument = get_instrument_master().get(symbol)
+    if instrument:
+        return True, instrument['name'] or symbol
+    
+    meta = get_chart_meta(symbol)
+    if meta:
+        return True, meta.get('longName') or meta.get('shortName', symbol)
+    return False, None
+
+def validate_many(symbols):
+    """
+    Validate a whole list of symbols (e.g. an imported portfolio)
+    
+    Known listings are checked offline, the rest concurrently through the
+    shared chart metadata cache.
+    
+    Args:
+        symbols: List of stock symbols
+    
+    Returns:
+        Dictionary with symbol -> (is_valid, stock_name or None)
+    """
+    symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+    master = get_instrument_master()
+    results = {}
+    unknown = []
+    for symbol in symbols:
+        instrument = master.get(symbol)
+        if instrument:
+            results[symbol] = (True, instrument['name'] or symbol)
+        else:
+            unknown.append(symbol)
+    
+    if unknown:
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(unknown))) as executor:
+            for symbol, result in zip(unknown, executor.map(validate_stock_symbol, unknown)):
+                results[symbol] = result
+    
+    return results
 
 def search_stocks(query):
     """
@@ -105,14 +125,17 @@ def search_stocks(query):
     Returns:
         List of matching stocks (symbol, name)
     """
+    # Master hits first; popular entries cover what it lacks (commodities,
+    # currency pairs, European listings missing from the seed list)
+    matches = get_instrument_master().search(query, limit=10)
+    
     popular = get_popular_stocks()
     query_lower = query.upper()
     
-    matches = []
-    
     # Search in popular stocks
+    seen = {symbol.upper() for symbol, _ in matches}
     for symbol, name in popular.items():
-        if query_lower in symbol.upper() or query_lower in name.upper():
+        if symbol not in seen and (query_lower in symbol.upper() or query_lower in name.upper()):
             matches.append((symbol, name))
     
     return matches[:10]  # Return top 10 matches
@@ -121,12 +144,20 @@ def search_by_isin(isin):
     """
     Search for stock symbol by ISIN
     
+    Only instruments with a known ISIN (the seed list, or rows added to
+    instruments.csv) resolve offline; anything else is looked up through
+    the Yahoo Finance search.
+    
     Args:
         isin: ISIN code (e.g., 'US0378331005' for AAPL)
     
     Returns:
         Tuple: (symbol, stock_name) or (None, None) if not found
     """
+    instrument = get_instrument_master().find_isin(isin)
+    if instrument:
+        return instrument['symbol'], instrument['name']
+    
     try:
         # Use Yahoo Finance API with ISIN search
         url = f"https://query1.finance.yahoo.com/v1/finance/search?q={isin}"
@@ -173,35 +204,22 @@ def get_stock_info(symbol_or_isin, search_by_isin_flag=False):
             symbol = symbol_or_isin.upper()
             name = None
         
-        # Get detailed info from Yahoo Finance
-        url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
+        # Get detailed info from Yahoo Finance (shared with price/validation lookups)
+        meta = get_chart_meta(symbol)
         
-        response = requests.get(url, headers=headers, timeout=5)
-        
-        if response.status_code == 200:
-            data = response.json()
+        if meta:
+            stock_name = name or meta.get('longName') or meta.get('shortName', symbol)
+            price = meta.get('regularMarketPrice')
+            currency = meta.get('currency', 'USD')
+            exchange = meta.get('exchange', '')
             
-            if 'chart' in data and 'result' in data['chart']:
-                result = data['chart']['result'][0]
-                
-                if 'meta' in result:
-                    meta = result['meta']
-                    stock_name = name or meta.get('longName') or meta.get('shortName', symbol)
-                    price = meta.get('regularMarketPrice')
-                    currency = meta.get('currency', 'USD')
-                    exchange = meta.get('exchange', '')
-                    
-                    return {
-                        'symbol': symbol,
-                        'name': stock_name,
-                        'price': price,
-                        'currency': currency,
-                        'exchange': exchange
-                    }
+            return {
+                'symbol': symbol,
+                'name': stock_name,
+                'price': price,
+                'currency': currency,
+                'exchange': exchange
+            }
         
         return None
     except Exception as e:
@@ -3,14 +3,30 @@ Transaction history tracking and PNL calculation
 """
 import json
 import os
+import threading
 from datetime import datetime
 from typing import List, Dict
 
+# One write lock per transaction file, shared by every instance in the process
+_file_locks = {}
+_file_locks_guard = threading.Lock()
+
+def _file_lock(path):
+    with _file_locks_guard:
+        return _file_locks.setdefault(os.path.abspath(path), threading.Lock())
+
 class TransactionHistory:
-    """Manage transaction history and calculate PNL"""
+    """Manage transaction history and calculate PNL.
+
+    Instances may be shared by several threads (dashboard sessions): writes
+    hold the file's lock, start from the file's current content and replace
+    the transaction list instead of changing it in place, so readers never
+    see a half-done edit and no write is lost.
+    """
     
     def __init__(self, data_file='transaction_history.json'):
         self.data_file = data_file
+        self._loaded_version = self.version
         self.transactions = self.load_history()
     
     def load_history(self):
@@ -23,28 +39,59 @@ class TransactionHistory:
                 return []
         return []
     
+    @property
+    def version(self):
+        """Changes whenever the transaction file is rewritten (by any process)"""
+        try:
+            stat = os.stat(self.data_file)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
     def save_history(self):
-        """Save transaction history to file"""
-        with open(self.data_file, 'w') as f:
+        """Save transaction history to file atomically"""
+        tmp_file = self.data_file + '.tmp'
+        with open(tmp_file, 'w') as f:
             json.dump(self.transactions, f, indent=2)
+        os.replace(tmp_file, self.data_file)
+        self._loaded_version = self.version
+    
+    def _reload_if_changed(self):
+        """Pick up writes made through another instance (call with the file lock held)"""
+        if self.version != self._loaded_version:
+            self._loaded_version = self.version
+            self.transactions = self.load_history()
     
     def add_transaction(self, exchange: str, asset: str, amount: float, 
                        price_usd: float, transaction_type: str, date: str = None):
         """Add a new transaction"""
-        transaction = {
-            'id': len(self.transactions) + 1,
-            'exchange': exchange,
-            'asset': asset,
-            'amount': amount,
-            'price_usd': price_usd,
-            'type': transaction_type,  # 'buy' or 'sell'
-            'date': date or datetime.now().isoformat(),
-            'value_usd': amount * price_usd
-        }
-        self.transactions.append(transaction)
-        self.save_history()
+        with _file_lock(self.data_file):
+            self._reload_if_changed()
+            transaction = {
+                'id': max((t.get('id', 0) for t in self.transactions), default=0) + 1,
+                'exchange': exchange,
+                'asset': asset,
+                'amount': amount,
+                'price_usd': price_usd,
+                'type': transaction_type,  # 'buy' or 'sell'
+                'date': date or datetime.now().isoformat(),
+                'value_usd': amount * price_usd
+            }
+            self.transactions = self.transactions + [transaction]
+            self.save_history()
         return transaction
     
+    def delete_transaction(self, transaction_id: int):
+        """Remove a transaction by id; returns True if it existed"""
+        with _file_lock(self.data_file):
+            self._reload_if_changed()
+            remaining = [t for t in self.transactions if t.get('id') != transaction_id]
+            if len(remaining) == len(self.transactions):
+                return False
+            self.transactions = remaining
+            self.save_history()
+        return True
+    
     def get_transactions_for_asset(self, exchange: str, asset: str):
         """Get all transactions for a specific asset"""
         return [t for t in self.transactions 
@@ -1,8 +1,19 @@
 """
 Common code for all Streamlit pages - professional and consistent design
 """
+import html
+import math
+
 import streamlit as st
-import pandas as pd
+
+from portfolio_data import SnapshotRegistry, StaleWhileRevalidate, load_portfolios, path_version
+
+# Seconds before the portfolio snapshot is reloaded in the background
+PORTFOLIO_TTL = 300
+
+# Files the shared stores are loaded from (the store classes' defaults)
+TRANSACTION_FILE = 'transaction_history.json'
+HISTORY_DIR = 'portfolio_history'
 
 def _safe_switch_page(page_name: str):
     """Switch to another page if supported by Streamlit, otherwise fall back.
@@ -231,6 +242,23 @@ def load_custom_css():
             border-left: 3px solid #6b7280;
         }
         
+        /* Asset cards grid - one element for a whole page of cards */
+        .asset-card-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fill, minmax(220px, 1fr));
+            gap: 0.5rem;
+        }
+        
+        .asset-card-title {
+            font-weight: 600;
+            color: #111827;
+        }
+        
+        .asset-card-meta {
+            color: #6b7280;
+            font-size: 0.8rem;
+        }
+        
         /* Sidebar styling */
         section[data-testid="stSidebar"] {
             background: #ffffff;
@@ -307,11 +335,14 @@ def render_sidebar():
         
         st.markdown("### Refresh")
         auto_refresh = st.checkbox("Auto-refresh", value=False)
+        refresh_interval = None
         if auto_refresh:
-            _refresh_interval = st.slider("Interval (sec)", 10, 300, 60)
+            refresh_interval = st.slider("Interval (sec)", 10, 300, 60)
+        st.session_state.auto_refresh_interval = refresh_interval
         
         if st.button("Refresh Now", type="primary", use_container_width=True):
             st.cache_data.clear()
+            refresh_portfolios()
             st.rerun()
         
         # Reset history button
@@ -336,63 +367,232 @@ def render_sidebar():
         
         st.markdown("---")
         import time
+        source = get_portfolio_source()
+        updated = source.fetched_at or time.time()
         st.markdown("**Ostatnia aktualizacja:**")
-        st.markdown(f"*{time.strftime('%H:%M:%S')}*")
+        st.markdown(f"*{time.strftime('%H:%M:%S', time.localtime(updated))}*")
     
     return currency
 
+@st.cache_resource
+def get_snapshot_registry():
+    """Snapshots shared by every session of this server process"""
+    return SnapshotRegistry()
+
+@st.cache_resource
+def _shared_portfolio_source():
+    return StaleWhileRevalidate(load_portfolios, ttl=PORTFOLIO_TTL)
+
+def get_portfolio_source():
+    """Process-wide stale-while-revalidate portfolio loader (sessions never copy its snapshots)"""
+    return _shared_portfolio_source()
+
+def get_portfolio_snapshot():
+    """(version, portfolios) of the last known snapshot; expired data is reloaded in the background"""
+    source = get_portfolio_source()
+    if source.fetched_at is None:
+        with st.spinner("⏳ Ładowanie danych portfolio..."):
+            snapshot = source.snapshot()
+        if source.fetched_at is None:
+            st.error(f"❌ Nie udało się pobrać danych portfolio: {source.error}")
+    else:
+        snapshot = source.snapshot()
+    render_data_age(source)
+    return snapshot
+
+def get_portfolios():
+    """Last known portfolios, returned at once; expired data is reloaded in the background"""
+    return get_portfolio_snapshot()[1]
+
+def get_live_snapshot():
+    """(version, portfolios) for auto-refresh fragments, re-priced on every tick.
+
+    Balances come from the shared snapshot (reloaded every few minutes),
+    prices from the crypto quote cache, so values move between balance
+    reloads. The version covers both, for keying derived data.
+    """
+    from portfolio_data import STABLECOINS, reprice_portfolios
+    from quote_cache import get_cached_crypto_prices
+    version, portfolios = get_portfolio_source().snapshot()
+    assets = sorted({b['asset'] for p in portfolios for b in p['balances'] if b['asset'] not in STABLECOINS})
+    prices = get_cached_crypto_prices(assets) if assets else {}
+    return (version, tuple(sorted(prices.items()))), reprice_portfolios(portfolios, prices)
+
+def get_transaction_history():
+    """Transaction store shared by all sessions, reloaded when its file changes"""
+    from transaction_history import TransactionHistory
+    return get_snapshot_registry().get(
+        'transaction_history', path_version(TRANSACTION_FILE), lambda: TransactionHistory(TRANSACTION_FILE)
+    )
+
+def get_portfolio_history():
+    """Portfolio history shared by all sessions, reloaded when the collector writes"""
+    from portfolio_history import PortfolioHistory
+    return get_snapshot_registry().get(
+        'portfolio_history', path_version(HISTORY_DIR), lambda: PortfolioHistory(HISTORY_DIR)
+    )
+
+def refresh_portfolios():
+    """Reload portfolios in the background, the current data stays on screen"""
+    get_portfolio_source().refresh()
+
+def render_data_age(source):
+    """Caption with the age of the shown snapshot"""
+    age = source.age
+    if age is None:
+        return
+    minutes = int(age // 60)
+    text = f"🕒 Dane sprzed {minutes} min" if minutes else "🕒 Dane aktualne"
+    if source.is_refreshing:
+        text += " · odświeżanie w tle..."
+    elif source.error:
+        text += " · ostatnie odświeżanie nie powiodło się"
+    st.caption(text)
+
+def get_refresh_interval():
+    """Auto-refresh period in seconds chosen in the sidebar (None when off)"""
+    return st.session_state.get('auto_refresh_interval')
+
+def live_fragment(func):
+    """Decorator for the price-dependent widgets of a page.
+
+    The decorated function re-runs on its own every auto-refresh interval,
+    leaving the rest of the page untouched. It should read its data from
+    the shared snapshot itself rather than from the last full run.
+    """
+    return st.fragment(run_every=get_refresh_interval())(func)
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _cached_transactions_csv(export_key, version, _load_rows):
+    # The rows are not hashed - the store version says whether they changed
+    from csv_export import transactions_csv
+    return transactions_csv(_load_rows())
+
+def render_transactions_export(label, file_name, export_key, version, load_rows):
+    """Two-step CSV export: the file is built only after the user asks for it.
+
+    `load_rows` returns the transactions to export and is called only when
+    no CSV for this store `version` is cached yet.
+    """
+    ready_key = f"{export_key}_ready"
+    if st.session_state.get(ready_key) != version:
+        if not st.button(label, key=f"{export_key}_prepare", use_container_width=True):
+            return
+        st.session_state[ready_key] = version
+    
+    st.download_button(
+        label="📥 Pobierz CSV",
+        data=_cached_transactions_csv(export_key, version, load_rows),
+        file_name=file_name,
+        mime="text/csv",
+        key=f"{export_key}_download",
+        use_container_width=True
+    )
+
 def add_reset_button():
     """Dodaje przycisk resetu portfolio history"""
     if st.button("Reset History", type="secondary", use_container_width=True):
-        import json
-        with open('portfolio_history.json', 'w') as f:
-            json.dump([], f)
+        from portfolio_history import PortfolioHistory, history_lock
+        with history_lock():
+            PortfolioHistory().clear_history()
         st.success("Historia portfolio wyczyszczona")
         st.rerun()
 
+def pnl_status(pnl):
+    """Status labels for a numeric PNL column (NaN = no transaction data)"""
+    import numpy as np
+    import pandas as pd
+    status = np.select([pnl > 0, pnl < 0, pnl == 0], ['Profit', 'Loss', 'Break even'], default='No data')
+    return pd.Series(status, index=pnl.index)
+
 def render_performance_section(title, df_filtered):
     """Renderuje sekcję najlepszych/najgorszych performerów"""
     if df_filtered.empty:
         st.info("Brak danych do wyświetlenia")
         return
     
-    # Extract PNL percentage from string column
+    # PNL % is a numeric column; rows without PNL data are skipped
     if 'PNL %' in df_filtered.columns:
-        df_filtered = df_filtered.copy()
-        df_filtered['PNL_num'] = pd.to_numeric(df_filtered['PNL %'].str.replace('%', '').str.replace('+', ''), errors='coerce')
-        df_sorted = df_filtered.sort_values('PNL_num', ascending=False, na_position='last')
+        df_sorted = df_filtered.dropna(subset=['PNL %']).sort_values('PNL %', ascending=False)
+        value_column = 'Wartość USD' if 'Wartość USD' in df_sorted.columns else 'Wartość'
         
         col_perf1, col_perf2 = st.columns(2)
         
-        with col_perf1:
-            st.markdown("#### Najlepsze")
-            if len(df_sorted) > 0:
-                best = df_sorted.iloc[0]
-                asset = best.get('Aktywo', 'N/A')
-                exchange = best.get('Giełda', 'N/A')
-                pnl_pct = best.get('PNL_num', 0)
-                value = best.get('Wartość USD', '$0')
-                st.metric(
-                    f"{asset} ({exchange})",
-                    f"{pnl_pct:+.2f}%",
-                    value
-                )
-        
-        with col_perf2:
-            st.markdown("#### Najgorsze")
-            if len(df_sorted) > 0:
-                worst = df_sorted.iloc[-1]
-                asset = worst.get('Aktywo', 'N/A')
-                exchange = worst.get('Giełda', 'N/A')
-                pnl_pct = worst.get('PNL_num', 0)
-                value = worst.get('Wartość USD', '$0')
-                st.metric(
-                    f"{asset} ({exchange})",
-                    f"{pnl_pct:+.2f}%",
-                    value
-                )
+        for column, label, row in ((col_perf1, "Najlepsze", 0), (col_perf2, "Najgorsze", -1)):
+            with column:
+                st.markdown(f"#### {label}")
+                if len(df_sorted) > 0:
+                    performer = df_sorted.iloc[row]
+                    asset = performer.get('Aktywo', 'N/A')
+                    exchange = performer.get('Giełda', 'N/A')
+                    value = performer.get(value_column, 0)
+                    st.metric(
+                        f"{asset} ({exchange})",
+                        f"{performer['PNL %']:+.2f}%",
+                        f"${value:,.2f}"
+                    )
     else:
         st.warning("Nie znaleziono kolumny PNL %")
 
-def render_asset_cards(assets_data, currency='USD', usd_to_pln=4.0):
-    """Renderuje kompaktowe karty z aktywami zamiast szerokich tabel"""
\ No newline at end of file
+# Cards drawn per page and cards shown before the rest is folded into "Pozostałe"
+CARDS_PER_PAGE = 24
+CARDS_TOP_N = 12
+
+def _asset_card_html(title, meta, value, pnl_percent, currency):
+    """One card as an HTML string"""
+    if pnl_percent is None or math.isnan(pnl_percent):
+        style, pnl_text = 'neutral', 'PNL: brak danych'
+    else:
+        style = 'profit' if pnl_percent > 0 else 'loss' if pnl_percent < 0 else 'neutral'
+        pnl_text = f"PNL: {pnl_percent:+.2f}%"
+    return (
+        f'<div class="asset-card asset-card-{style}">'
+        f'<div class="asset-card-title">{html.escape(str(title))}</div>'
+        f'<div class="asset-card-meta">{html.escape(str(meta))}</div>'
+        f'<div>{value:,.2f} {currency}</div>'
+        f'<div class="asset-card-meta">{pnl_text}</div>'
+        f'</div>'
+    )
+
+def render_asset_cards(assets_data, currency='USD', usd_to_pln=4.0, key='asset_cards'):
+    """Renderuje kompaktowe karty z aktywami zamiast szerokich tabel
+
+    Cards keep the order of `assets_data` (the numeric holdings frame).
+    By default the first CARDS_TOP_N are shown and the rest is summed into
+    a single "Pozostałe" card; with "Wszystkie" the cards are paginated.
+    Either way a page of cards is sent as one HTML element, so the number
+    of Streamlit elements does not grow with the number of assets.
+    """
+    if len(assets_data) == 0:
+        st.info("Brak danych do wyświetlenia")
+        return
+    
+    value_column = 'Wartość USD' if 'Wartość USD' in assets_data.columns else 'Wartość'
+    rate = usd_to_pln if currency == 'PLN' else 1.0
+    
+    show_all = st.checkbox("Pokaż wszystkie", value=False, key=f"{key}_all")
+    if show_all:
+        pages = math.ceil(len(assets_data) / CARDS_PER_PAGE)
+        page = 1
+        if pages > 1:
+            page = st.number_input(f"Strona (z {pages})", min_value=1, max_value=pages, value=1, key=f"{key}_page")
+        visible, others = assets_data.iloc[(page - 1) * CARDS_PER_PAGE:page * CARDS_PER_PAGE], None
+    else:
+        visible, others = assets_data.iloc[:CARDS_TOP_N], assets_data.iloc[CARDS_TOP_N:]
+    
+    # Plain lists instead of iterrows - one pass over the visible columns
+    cards = [
+        _asset_card_html(asset, exchange, value * rate, pnl, currency)
+        for asset, exchange, value, pnl in zip(
+            visible['Aktywo'],
+            visible['Giełda'] if 'Giełda' in visible.columns else ['XTB'] * len(visible),
+            visible[value_column].to_numpy(),
+            visible['PNL %'].to_numpy() if 'PNL %' in visible.columns else [None] * len(visible)
+        )
+    ]
+    if others is not None and len(others):
+        cards.append(_asset_card_html(
+            "Pozostałe", f"{len(others)} aktywów", float(others[value_column].sum()) * rate, None, currency
+        ))
+    
+    st.markdown(f'<div class="asset-card-grid">{"".join(cards)}</div>', unsafe_allow_html=True)
@@ -1,20 +1,13 @@
 """
 Utility functions for portfolio tracker
 """
-import requests
 from datetime import datetime
 
+from fx_rates import fx_rates
+
 def get_usd_to_pln_rate():
-    """Get current USD to PLN exchange rate"""
-    try:
-        response = requests.get('https://api.exchangerate-api.com/v4/latest/USD', timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            return data['rates'].get('PLN', 4.0)
-    except:
-        pass
-    # Fallback rate
-    return 4.0
+    """Get current USD to PLN exchange rate (from the shared FX rate table)"""
+    return fx_rates.rate('USD', 'PLN')
 
 def format_currency(amount, currency='USD'):
     """Format currency amount"""